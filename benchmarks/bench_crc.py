@@ -0,0 +1,92 @@
+#!/bin/env python3
+"""
+Compare the per-read CRC cost of the old bit-shifting CRCs with the
+table-driven ones in firmware/crc.py, on the host.
+
+Absolute times are much lower than on an RP2040 running CircuitPython,
+but the ratio is a fair guide as both are plain interpreted loops.
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "firmware"))
+
+from crc import crc8, crc16_modbus
+
+
+def crc8_bitwise(data) -> int:
+    crc = 0xFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x80:
+                crc <<= 1
+                crc ^= 0x31
+            else:
+                crc <<= 1
+    return crc & 0xFF
+
+
+def crc16_bitwise(data) -> int:
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc >>= 1
+                crc ^= 0xA001
+            else:
+                crc >>= 1
+    return crc
+
+
+def sht3x_single(crc):
+    # Single-shot read: two words, each with its own CRC.
+    data = bytes(range(6))
+    crc(data[0:2])
+    crc(data[3:5])
+
+
+def sht3x_periodic_old(crc):
+    # Periodic fetch of 48 bytes, as the old _unpack did it: the first
+    # CRC of each pair in one pass, then every CRC again in a second.
+    data = bytes(range(48))
+    for i in range(8):
+        crc(data[i * 6:(i * 6) + 2])
+    for i in range(16):
+        crc(data[i * 3:(i * 3) + 2])
+
+
+def sht3x_periodic_new(crc):
+    data = bytes(range(48))
+    for i in range(16):
+        crc(data[i * 3:(i * 3) + 2])
+
+
+def am2320_read(crc):
+    # Temperature and humidity: 2 header bytes and 4 data bytes.
+    crc(bytes(range(6)))
+
+
+def bench(name, before, after, number=20_000):
+    t0 = timeit.timeit(before, number=number) / number * 1e6
+    t1 = timeit.timeit(after, number=number) / number * 1e6
+    print(f"{name:24} {t0:8.2f}us {t1:8.2f}us {t0 / t1:6.1f}x")
+
+
+def main():
+    for i in range(256):
+        data = bytes([i, 255 - i, i ^ 0x5A])
+        assert crc8(data) == crc8_bitwise(data)
+        assert crc16_modbus(data) == crc16_bitwise(data)
+
+    print(f"{'per read':24} {'before':>10} {'after':>10} {'speedup':>7}")
+    bench("SHT3x single", lambda: sht3x_single(crc8_bitwise), lambda: sht3x_single(crc8))
+    bench("SHT3x periodic (48B)", lambda: sht3x_periodic_old(crc8_bitwise), lambda: sht3x_periodic_new(crc8))
+    bench("AM2320 T+H", lambda: am2320_read(crc16_bitwise), lambda: am2320_read(crc16_modbus))
+
+
+if __name__ == '__main__':
+    main()
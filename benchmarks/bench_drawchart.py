@@ -0,0 +1,141 @@
+#!/bin/env python3
+"""
+Frames per second for SSD1306.drawchart on the host, drawing into a plain
+adafruit_framebuf FrameBuffer rather than the display.
+
+It times full redraws and incremental (scrolled) updates of a 64-reading
+chart, each with the framebuf line drawing and with lines drawn a pixel()
+call at a time as it used to be. As with bench_crc.py, the absolute
+numbers are far higher than on the RP2040, but the ratios are a fair
+guide.
+
+It also checks that the incremental chart matches a full redraw of it.
+Scrolling moves whole pixels, so a point may land a column to one side,
+but no further.
+"""
+
+import os
+import sys
+import time
+import types
+
+FIRMWARE = os.path.join(os.path.dirname(__file__), "..", "firmware")
+sys.path.insert(0, FIRMWARE)
+
+# oled.py only needs the display driver to open the display, which isn't
+# done here; give it an empty module so it imports without the board's
+# I2C libraries.
+sys.modules.setdefault("adafruit_ssd1306", types.ModuleType("adafruit_ssd1306"))
+
+import adafruit_framebuf
+from circularbuffer import CircularBuffer
+from oled import SSD1306
+from reading import Reading
+
+READINGS = 64
+FRAMES = 300
+
+
+class PerPixelFrameBuffer(adafruit_framebuf.FrameBuffer):
+    """Lines drawn through pixel(), one point at a time."""
+
+    def line(self, x_0, y_0, x_1, y_1, color):
+        d_x = abs(x_1 - x_0)
+        d_y = abs(y_1 - y_0)
+        x, y = x_0, y_0
+        s_x = -1 if x_0 > x_1 else 1
+        s_y = -1 if y_0 > y_1 else 1
+        if d_x > d_y:
+            err = d_x / 2.0
+            while x != x_1:
+                self.pixel(x, y, color)
+                err -= d_y
+                if err < 0:
+                    y += s_y
+                    err += d_x
+                x += s_x
+        else:
+            err = d_y / 2.0
+            while y != y_1:
+                self.pixel(x, y, color)
+                err -= d_x
+                if err < 0:
+                    x += s_x
+                    err += d_y
+                y += s_y
+        self.pixel(x, y, color)
+
+
+def make_oled(framebuffer_class, buffer, incremental: bool) -> SSD1306:
+    oled = SSD1306.__new__(SSD1306)
+    oled.opts = {"oled_incremental": incremental}
+    oled.buffer = buffer
+    oled.is_reverse = False
+    oled.oled = framebuffer_class(bytearray(SSD1306.OLED_W * SSD1306.OLED_H // 8),
+                                  SSD1306.OLED_W, SSD1306.OLED_H, adafruit_framebuf.MVLSB)
+    return oled
+
+
+def temp(i: int) -> float:
+    # A slow wobble within a fixed range, so the Y scale settles.
+    return 20.0 + ((i * 7) % 23) / 10
+
+
+def fps(framebuffer_class, incremental: bool) -> float:
+    buffer = CircularBuffer(READINGS)
+    for i in range(READINGS):
+        buffer.overwrite(Reading(i * 5_000_000, temp(i), 50.0, 0, i))
+    oled = make_oled(framebuffer_class, buffer, incremental)
+    oled.drawchart(buffer, 1, (0, 0), (128, 18))
+
+    elapsed = 0
+    for i in range(READINGS, READINGS + FRAMES):
+        buffer.overwrite(Reading(i * 5_000_000, temp(i), 50.0, 0, i))
+        t0 = time.perf_counter()
+        oled.drawchart(buffer, 1, (0, 0), (128, 18))
+        elapsed += time.perf_counter() - t0
+    return FRAMES / elapsed
+
+
+def pixels(oled: SSD1306) -> set:
+    fb = oled.oled
+    return {(x, y) for x in range(fb.width) for y in range(fb.height) if fb.pixel(x, y)}
+
+
+def unmatched(a: set, b: set) -> int:
+    """The pixels of 'a' with none of 'b' in the same row, a column either side."""
+    return sum(1 for x, y in a if not {(x - 1, y), (x, y), (x + 1, y)} & b)
+
+
+def check() -> bool:
+    """Draw each frame both ways, and compare."""
+    buffer = CircularBuffer(READINGS)
+    full = make_oled(adafruit_framebuf.FrameBuffer, buffer, False)
+    incremental = make_oled(adafruit_framebuf.FrameBuffer, buffer, True)
+
+    worst = 0
+    for i in range(READINGS + FRAMES):
+        buffer.overwrite(Reading(i * 5_000_000, temp(i), 50.0, 0, i))
+        full.drawchart(buffer, 1, (0, 0), (128, 18))
+        incremental.drawchart(buffer, 1, (0, 0), (128, 18))
+        a, b = pixels(full), pixels(incremental)
+        worst = max(worst, unmatched(a, b), unmatched(b, a))
+
+    print(f"incremental vs full redraw: {worst} pixels out of place at most")
+    return worst == 0
+
+
+def main():
+    os.chdir(FIRMWARE)   # for font5x8.bin
+    ok = check()
+    print(f"{'drawchart':24} {'per-pixel':>10} {'framebuf':>10} {'speedup':>7}")
+    for name, incremental in (("full redraw", False), ("incremental", True)):
+        before = fps(PerPixelFrameBuffer, incremental)
+        after = fps(adafruit_framebuf.FrameBuffer, incremental)
+        print(f"{name:24} {before:7.0f}fps {after:7.0f}fps {after / before:6.1f}x")
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+"""
+Check that single-shot SHT31D reads don't allocate.
+
+Run on the board (copy to CIRCUITPY with the firmware and import it from
+the REPL, or save it as code.py). It prints the gc.mem_free() change
+across each read, which should be 0.
+"""
+
+import gc
+import board
+import busio
+import adafruit_sht31d
+
+READS = 10
+
+i2c = busio.I2C(board.SCL, board.SDA, frequency=400_000)
+try:
+    sht = adafruit_sht31d.SHT31D(i2c, 0x45)
+except ValueError:
+    sht = adafruit_sht31d.SHT31D(i2c, 0x44)
+
+# The first read may create cached state; don't count it.
+t, h = sht.temperature, sht.relative_humidity
+
+for _ in range(READS):
+    gc.collect()
+    before = gc.mem_free()
+    t = sht.temperature
+    h = sht.relative_humidity
+    s = sht.status
+    delta = before - gc.mem_free()
+    print(f"mem_free delta per read: {delta} bytes")
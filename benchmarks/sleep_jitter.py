@@ -0,0 +1,46 @@
+"""
+Measure how late the device wakes from light sleep.
+
+Run on the board (copy to CIRCUITPY and import it from the REPL, or save
+it as code.py). It light-sleeps to a drift-free 'now + step' schedule,
+waking LIGHT_SLEEP_MARGIN_MILLISECS early and sleeping the rest as
+code.py does, and prints how far each wake was from the schedule. Set
+MARGIN to 0 to see the error of the TimeAlarm alone.
+
+Current draw can't be measured from the board itself: watch it with a
+USB power meter between the host and the board while this runs, and
+again with LIGHT_SLEEP set False to compare with time.sleep().
+"""
+
+import time
+import alarm
+
+STEP_MILLISECS = 5_000
+MARGIN_MILLISECS = 10
+WAKES = 20
+LIGHT_SLEEP = True
+
+MILLISECS_TO_NANOSECS = 1_000_000
+NANOSECS_TO_SECS = 1_000_000_000
+NANOSECS_TO_MICROSECS = 1_000
+
+step = STEP_MILLISECS * MILLISECS_TO_NANOSECS
+margin = MARGIN_MILLISECS * MILLISECS_TO_NANOSECS
+
+worst = 0
+now = time.monotonic_ns()
+for _ in range(WAKES):
+    now += step
+    until = now - margin
+    delay = (until - time.monotonic_ns()) / NANOSECS_TO_SECS
+    if LIGHT_SLEEP:
+        wake = time.monotonic() + delay
+        alarm.light_sleep_until_alarms(alarm.time.TimeAlarm(monotonic_time=wake))
+    else:
+        time.sleep(delay)
+    remaining = now - time.monotonic_ns()
+    if remaining > 0:
+        time.sleep(remaining / NANOSECS_TO_SECS)
+    late = (time.monotonic_ns() - now) // NANOSECS_TO_MICROSECS
+    worst = max(worst, abs(late))
+    print(f"wake error: {late} us (worst {worst} us)")
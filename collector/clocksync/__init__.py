@@ -0,0 +1,100 @@
+import sys
+import time
+
+
+class ClockSkew:
+    """
+    Streaming least-squares estimate of a device clock against host time.
+
+    Each reading pairs the device's own timestamp (seconds since it booted)
+    with the host time at which the line arrived. A weighted linear fit of
+    host time on device time gives the device clock's offset and rate, and
+    from that the host time at which any reading was actually taken, even
+    if the line was delayed or buffered on the way.
+
+    Older points are exponentially forgotten (factor 'forget' per sample)
+    so the fit follows slow drift of the device oscillator. Points that
+    disagree with the fit by more than 'outlier' seconds are not used,
+    and the fit is only restarted if 'min_samples' of them arrive in a row
+    or the device clock goes backwards (the device rebooted).
+    """
+
+    # Any real crystal is within a fraction of a percent of nominal; a
+    # fitted rate outside this is noise from too short a baseline.
+    MAX_RATE_ERROR = 0.01
+
+    def __init__(self, forget: float = 0.995, outlier: float = 2.0, min_samples: int = 4):
+        self.forget = forget
+        self.outlier = outlier
+        self.min_samples = min_samples
+        self.reset()
+
+    def reset(self):
+        """
+        Forget all history; the next update starts a new fit.
+        """
+        self.origin_dev = None
+        self.origin_host = None
+        self.last_dev = None
+        self.count = 0
+        self.rejected = 0
+        self.sw = self.sx = self.sy = self.sxx = self.sxy = 0.0
+        self.offset = 0.0
+        self.rate = 1.0
+
+    def estimate(self, dev: float) -> float:
+        """
+        Return the host time corresponding to device time 'dev'.
+        """
+        if self.origin_dev is None:
+            return None
+        return self.origin_host + self.offset + self.rate * (dev - self.origin_dev)
+
+    def update(self, dev: float, host: float) -> float:
+        """
+        Add a (device time, host arrival time) pair to the fit and return
+        the estimated host time at which the reading was taken.
+        """
+        if self.last_dev is not None and dev < self.last_dev:
+            print(f"{round(host, 3)}: Device clock went backwards ({self.last_dev} -> {dev}), resyncing", file=sys.stderr)
+            self.reset()
+
+        if self.origin_dev is None:
+            self.origin_dev, self.origin_host = dev, host
+
+        self.last_dev = dev
+
+        if self.count >= self.min_samples:
+            residual = host - self.estimate(dev)
+            if abs(residual) > self.outlier:
+                self.rejected += 1
+                if self.rejected < self.min_samples:
+                    return self.estimate(dev)
+
+                print(f"{round(host, 3)}: Device clock lost sync ({residual:.3f}s), resyncing", file=sys.stderr)
+                self.reset()
+                self.origin_dev, self.origin_host = dev, host
+                self.last_dev = dev
+
+        self.rejected = 0
+        self._accumulate(dev - self.origin_dev, host - self.origin_host)
+        return self.estimate(dev)
+
+    def _accumulate(self, x: float, y: float):
+        f = self.forget
+        self.sw = f * self.sw + 1.0
+        self.sx = f * self.sx + x
+        self.sy = f * self.sy + y
+        self.sxx = f * self.sxx + x * x
+        self.sxy = f * self.sxy + x * y
+        self.count += 1
+
+        rate = 1.0
+        denom = self.sw * self.sxx - self.sx * self.sx
+        if denom > 1e-9:
+            rate = (self.sw * self.sxy - self.sx * self.sy) / denom
+            if abs(rate - 1.0) > self.MAX_RATE_ERROR:
+                rate = 1.0
+
+        self.rate = rate
+        self.offset = (self.sy - rate * self.sx) / self.sw
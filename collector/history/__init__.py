@@ -0,0 +1,66 @@
+import bisect
+import collections
+
+
+class History:
+    """
+    Readings received from the device, kept in order of acquisition time.
+
+    Readings can arrive out of order (e.g. a batch of buffered readings
+    sent after a reconnect), so each is inserted at its place by its
+    estimated 'timestamp', and a reading whose device 'time' has already
+    been seen in the current boot of the device is dropped as a duplicate.
+    Times are compared to the millisecond, which is all the device's
+    buffer keeps.
+    """
+
+    def __init__(self, maxlen: int = 1024):
+        self.maxlen = maxlen
+        self.stamps = collections.deque()
+        self.times = collections.deque()
+        self.items = collections.deque()
+        self.seen = set()
+
+    def restart(self):
+        """
+        The device rebooted, so its times start again from zero. Older
+        readings are kept, but no longer count as duplicates.
+        """
+        self.seen = set()
+
+    def add(self, data: dict) -> bool:
+        """
+        Insert reading 'data' at its place by timestamp. Returns False if
+        it was a duplicate and so not added.
+        """
+        dev, stamp = round(data["time"], 3), data["timestamp"]
+        if dev in self.seen:
+            return False
+        self.seen.add(dev)
+
+        if len(self.stamps) == 0 or stamp >= self.stamps[-1]:
+            self.stamps.append(stamp)
+            self.times.append(dev)
+            self.items.append(data)
+        else:
+            i = bisect.bisect_right(self.stamps, stamp)
+            self.stamps.insert(i, stamp)
+            self.times.insert(i, dev)
+            self.items.insert(i, data)
+
+        while len(self.items) > self.maxlen:
+            self.seen.discard(self.times.popleft())
+            self.stamps.popleft()
+            self.items.popleft()
+        return True
+
+    def latest(self) -> dict:
+        if len(self.items) == 0:
+            return {}
+        return self.items[-1]
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items)
@@ -0,0 +1,71 @@
+import collections
+
+SEQ_MODULUS = 0x10000   # the device's sequence number is 16 bits
+
+
+class LinkStats:
+    """
+    Counts readings received, lost, duplicated and out of order on the
+    serial link, from the per-boot sequence number the device gives each
+    reading.
+
+    A gap in the sequence counts as lost. If one of the missing readings
+    turns up later it was out of order rather than lost; if a reading
+    turns up again it is a duplicate. Only the last 'window' sequence
+    numbers are remembered for this.
+    """
+
+    def __init__(self, window: int = 256):
+        self.window = window
+        self.received = 0
+        self.lost = 0
+        self.duplicated = 0
+        self.reordered = 0
+        self.restart()
+
+    def restart(self):
+        """
+        The device rebooted, so its sequence starts again. The counts
+        carry on.
+        """
+        self.expected = None
+        self.recent = collections.deque()
+        self.seen = set()
+        # Insertion ordered, so the oldest gaps can be forgotten first.
+        self.missing = {}
+
+    def update(self, seq: int):
+        """
+        Account for a reading with sequence number 'seq'.
+        """
+        self.received += 1
+
+        if seq in self.seen:
+            self.duplicated += 1
+            return
+
+        if self.expected is not None:
+            gap = (seq - self.expected) % SEQ_MODULUS
+            if gap >= SEQ_MODULUS // 2:
+                # Behind the sequence: late, or a gap we didn't remember.
+                if seq in self.missing:
+                    del self.missing[seq]
+                    self.lost -= 1
+                self.reordered += 1
+                self._remember(seq)
+                return
+
+            for i in range(max(gap - self.window, 0), gap):
+                self.missing[(self.expected + i) % SEQ_MODULUS] = True
+            while len(self.missing) > self.window:
+                del self.missing[next(iter(self.missing))]
+            self.lost += gap
+
+        self.expected = (seq + 1) % SEQ_MODULUS
+        self._remember(seq)
+
+    def _remember(self, seq: int):
+        self.seen.add(seq)
+        self.recent.append(seq)
+        while len(self.recent) > self.window:
+            self.seen.discard(self.recent.popleft())
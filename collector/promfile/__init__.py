@@ -3,16 +3,34 @@ import sys
 import os
 import json
 import time
+from typing import Optional
+
+from clocksync import ClockSkew
+from history import History
+from linkstats import LinkStats
 
 __version__ = "1.0"
 
 class PromFile:
 
-    def __init__(self, prefix: str, promfile: str, args: dict={}):
+    # Optional reading fields, and their units, written when present.
+    SPREAD_PARAMS = (
+        ("samples", ""),
+        ("temp_min", "C"), ("temp_max", "C"), ("temp_sd", "C"),
+        ("humidity_min", "%"), ("humidity_max", "%"), ("humidity_sd", "%"),
+    )
+
+    def __init__(self, prefix: str, promfile: str, args: dict={}, maxAge: float = 10):
         self.args = args
         self.prefix = prefix
         self.promfile = promfile
+        self.maxAge = maxAge
+
+        # Staleness is tracked against the monotonic clock so that NTP steps
+        # of the wall clock can't expire (or resurrect) the promfile. The
+        # deadline is None when there is no live file to expire.
         self.lastwrite = 0
+        self.deadline = None
 
         self.in_port = ""
         if "serial" in args:
@@ -22,7 +40,25 @@ class PromFile:
         if "stdout" in args:
             self.echo_stdout = args.stdout
 
-    def wr_param(self, outf: io.TextIOBase, vname: str, value: float, vtype: str = "gauge", keys: dict = {}):
+        self.timestamps = False
+        if "timestamps" in args:
+            self.timestamps = args.timestamps
+
+        # Estimate of the device clock, used to place each reading at the
+        # host time it was actually taken.
+        self.clock = ClockSkew()
+
+        # Readings received so far, and the batch of buffered readings
+        # being received from the device (None if not in a batch).
+        self.history = History()
+        self.batch = None
+        self.batch_size = 0
+
+        # Quality of the serial link, from the readings' sequence numbers.
+        self.link = LinkStats()
+
+    def wr_param(self, outf: io.TextIOBase, vname: str, value: float, vtype: str = "gauge", keys: dict = {},
+                 timestamp: float = None):
         """
         Write out a node_exporter parameter type line and value line to 'outf'.
 
@@ -30,83 +66,241 @@ class PromFile:
         The second (unique) part of the name is 'vname', and the parameter's value
         is 'value'. vtype is the parameter type (Prometheus typenames), and
         keys are associated context for this parameter, such as a channel number.
+        If 'timestamp' (unix epoch secs) is given it is appended to the value
+        line, in milliseconds as the exposition format requires.
+        """
+        self.wr_series(outf, vname, [(value, timestamp)], vtype, keys)
+
+    def wr_series(self, outf: io.TextIOBase, vname: str, values: list, vtype: str = "gauge", keys: dict = {}):
+        """
+        As wr_param(), but writing one value line for each (value, timestamp)
+        pair in 'values', which should be in timestamp order.
         """
         vname = self.prefix + vname
-        value = f"{value:8.3f}"
 
         kv = [f"{k}=\"{v}\"" for k, v in keys.items()]
         k_str = ",".join(kv)
 
         print(f"# TYPE {vname} {vtype}", file=outf)
-        print(vname + "{" + k_str +"} " + str(value), file=outf)
+        for value, timestamp in values:
+            ts_str = ""
+            if timestamp is not None:
+                ts_str = f" {int(round(timestamp * 1000))}"
+            print(vname + "{" + k_str + "} " + f"{value:8.3f}" + ts_str, file=outf)
 
 
-    def write_outfile(self, fout: io.TextIOBase, is_open: bool, line: str, tod: float) -> dict:
+    def write_outfile(self, fout: io.TextIOBase, is_open: bool, samples: list) -> list:
         """
-        Write the complete parameter file to the stream, using data values found
-        in 'line', which is a self-contained JSON coded object.
+        Write the complete parameter file to the stream, using the readings
+        in 'samples' as decoded by parse_line().
         If the serial input is not open, create an output with a '|prefix_|up 0'
         value to indicate the service is down.
         """
         global __version__
 
         self.wr_param(fout, "info", 1, keys={"name": "tempmon", "version": __version__, "tty": self.in_port} )
-        self.wr_param(fout, "up", 1 if is_open and len(line) > 0 else 0)
+        self.wr_param(fout, "up", 1 if is_open and len(samples) > 0 else 0)
 
-        # only lines starting '{' are json, ignore others.
-        if is_open and len(line) > 0 and line[0] == '{':
-
-            if self.echo_stdout:
-                print(f"{tod}: parsing '{line}' as JSON", file=sys.stderr)
-
-            try:
-                data = json.loads(line)
-            except Exception as ex:
-                print(f"{tod}: Exception {ex} while parsing '{line}' as JSON", file=sys.stderr)
-                return {}
-
-            # If there are serial line errors the names may get corrupted.
-            if "temp" in data and "humidity" in data and "time" in data:
-                self.wr_param(fout, "temp", data["temp"], keys={"unit": "C"})         # centigrade
-                self.wr_param(fout, "humidity", data["humidity"], keys={"unit": "%"}) # RH %
-                self.wr_param(fout, "uptime", data["time"], keys={"unit": "s"})       # time secs
-            else:
-                print(f"{tod}: Dictionary invalid while parsing '{line}' as JSON", file=sys.stderr)
-                return {}
+        if is_open and len(samples) > 0:
+            def series(key):
+                return [(d[key], d["timestamp"] if self.timestamps else None) for d in samples]
+
+            self.wr_series(fout, "temp", series("temp"), keys={"unit": "C"})         # centigrade
+            self.wr_series(fout, "humidity", series("humidity"), keys={"unit": "%"}) # RH %
+            self.wr_series(fout, "uptime", series("time"), keys={"unit": "s"})       # time secs
+
+            # Readings averaged from several measurements say how many, and
+            # how much they varied.
+            for vname, unit in self.SPREAD_PARAMS:
+                if all(vname in d for d in samples):
+                    self.wr_series(fout, vname, series(vname), keys={"unit": unit} if unit else {})
+
+            self.wr_param(fout, "link_received_total", self.link.received, vtype="counter")
+            self.wr_param(fout, "link_lost_total", self.link.lost, vtype="counter")
+            self.wr_param(fout, "link_duplicated_total", self.link.duplicated, vtype="counter")
+            self.wr_param(fout, "link_reordered_total", self.link.reordered, vtype="counter")
 
             fout.flush()
-            self.lastwrite = time.time()
-            return data
+            self.lastwrite = time.monotonic()
+            self.deadline = self.lastwrite + self.maxAge
+            return samples
 
         fout.flush()
-        return {}
+        return []
+
+
+    @property
+    def in_batch(self) -> bool:
+        """
+        True while a batch of buffered readings is being received.
+        """
+        return self.batch is not None
+
+    def parse_line(self, line: str, tod: float) -> dict:
+        """
+        Decode 'line', a self-contained JSON coded object, received at host
+        time 'tod'. Valid readings have the estimated host time of
+        acquisition added as 'timestamp' by check_reading(). Batch markers
+        are returned as decoded. Returns {} if the line isn't valid.
+        """
+        # only lines starting '{' are json, ignore others.
+        if len(line) == 0 or line[0] != '{':
+            return {}
+
+        if self.echo_stdout:
+            print(f"{tod}: parsing '{line}' as JSON", file=sys.stderr)
+
+        try:
+            data = json.loads(line)
+        except Exception as ex:
+            print(f"{tod}: Exception {ex} while parsing '{line}' as JSON", file=sys.stderr)
+            return {}
 
+        # Answers to commands sent to the device aren't readings, and nor
+        # are the minutes, hours and log dumps (their markers and periods).
+        if "reply" in data:
+            if "error" in data:
+                print(f"{tod}: Device command {data['reply']} failed: {data['error']}", file=sys.stderr)
+            return {}
+        if "rollups" in data or "period" in data or "log" in data:
+            return {}
 
-    def write_promfile(self, is_open: bool, line: str, tod: float):
+        # If there are serial line errors the names may get corrupted.
+        if not ("batch" in data or ("temp" in data and "humidity" in data and "time" in data)):
+            print(f"{tod}: Dictionary invalid while parsing '{line}' as JSON", file=sys.stderr)
+            return {}
+
+        return self.check_reading(data, tod)
+
+    def check_reading(self, data: dict, tod: float) -> dict:
+        """
+        Add the estimated host time of acquisition to reading 'data' (from
+        a JSON line or binary frame) as 'timestamp'. Once the device has
+        been told the time it sends the Unix time of each reading as
+        'epoch', and that is used instead of the estimate.
+        """
+        if "batch" in data:
+            if data["batch"] > 0 and "time" in data:
+                self.sync_clock(data["time"], tod)
+            return data
+
+        if self.in_batch:
+            # Buffered readings are older than their arrival; place them
+            # using the clock fit without adding them to it.
+            data["timestamp"] = self.clock.estimate(data["time"])
+        else:
+            # The fit is still kept, as it notices the device rebooting.
+            data["timestamp"] = self.sync_clock(data["time"], tod)
+            if "seq" in data:
+                self.link.update(data["seq"])
+        if "epoch" in data:
+            data["timestamp"] = data["epoch"]
+        return data
+
+    def sync_clock(self, dev: float, tod: float) -> float:
+        """
+        Add a live device time to the clock fit, noting if the device has
+        rebooted.
+        """
+        if self.clock.last_dev is not None and dev < self.clock.last_dev:
+            self.history.restart()
+            self.link.restart()
+        return self.clock.update(dev, tod)
+
+    def end_batch(self) -> list:
+        """
+        Finish the current batch, returning the readings in it that were
+        not already in the history, in timestamp order.
+        """
+        batch, self.batch = self.batch, None
+        samples = [d for d in batch if self.history.add(d)]
+        samples.sort(key=lambda d: d["timestamp"])
+        print(f"{round(time.time(), 3)}: Batch of {len(batch)} readings, {len(samples)} new", file=sys.stderr)
+        return samples
+
+    def write_promfile(self, is_open: bool, line, tod: float):
         """
         Write the promfile to the output file and if required to stdout.
+        'line' is a JSON text line, or a reading already decoded from a
+        binary frame.
+
+        Readings that arrive in a batch are held until the batch ends and
+        are then written together; with timestamps enabled every new
+        reading in it is exposed, otherwise just the latest.
         """
+        data = {}
+        if is_open and isinstance(line, dict):
+            data = self.check_reading(line, tod)
+        elif is_open:
+            data = self.parse_line(line, tod)
+
+        # Not a reading (a command reply, console text, a bad line): keep
+        # the promfile as it is until the next reading, or its deadline.
+        if is_open and len(data) == 0:
+            return data
+
+        samples = []
+        if "batch" in data:
+            if self.in_batch:
+                samples = self.end_batch()
+            if data["batch"] > 0:
+                self.batch = []
+                self.batch_size = data["batch"]
+            if len(samples) == 0:
+                return data
+
+        elif len(data) > 0:
+            if self.in_batch:
+                if len(self.batch) < self.batch_size:
+                    self.batch.append(data)
+                    return data
+                # The end marker was lost: this one must be live.
+                samples = self.end_batch()
+
+            # A reading taken during a dump comes in the batch and live.
+            if self.history.add(data):
+                samples.append(data)
+            if len(samples) == 0:
+                return data
+
+        if not self.timestamps and len(samples) > 0:
+            samples = [self.history.latest()]
 
         if self.echo_stdout:
-            self.write_outfile(sys.stdout, is_open, line, tod)
+            self.write_outfile(sys.stdout, is_open, samples)
 
         with open(self.promfile, "w", buffering=1) as fout:
-            data = self.write_outfile(fout, is_open, line, tod)
+            self.write_outfile(fout, is_open, samples)
 
         return data
 
-    def delete_expired_promfiles(self, maxAge: int = 10):
+    def time_to_expiry(self) -> Optional[float]:
+        """
+        Return the seconds remaining before the promfile expires, or None
+        if there is nothing waiting to expire.
+        """
+        if self.deadline is None:
+            return None
+        return max(self.deadline - time.monotonic(), 0)
+
+    def delete_expired_promfiles(self):
         """
         Don't leave promfiles lying around too long or they give a false view
         of the system state.
+
+        The file is removed once the deadline set by the last successful
+        write has passed; no filesystem calls are made until then.
         """
-        now = time.time()
-        if ((now - self.lastwrite) > maxAge and
-            os.path.exists(self.promfile) and
-            (now - os.path.getmtime(self.promfile)) > maxAge):
-            try:
-                print(f"{get_tod()}: Delete file {self.promfile}, too old ({now - self.lastwrite}s)", file=sys.stderr)
-                os.remove(self.promfile)
-            except:
-                pass
+        if self.deadline is None:
+            return
+
+        now = time.monotonic()
+        if now < self.deadline:
+            return
 
+        self.deadline = None
+        try:
+            print(f"{round(time.time(), 3)}: Delete file {self.promfile}, too old ({now - self.lastwrite:.3f}s)", file=sys.stderr)
+            os.remove(self.promfile)
+        except OSError:
+            pass
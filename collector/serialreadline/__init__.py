@@ -4,8 +4,15 @@ import time
 import traceback
 import sys
 
+from telemetry import FrameDecoder, FRAME_SYNC, FRAME_LEN, FRAME_LENGTHS, BINARY_COMMAND, epoch_command
+
 SerialThreadPoison = False
 
+DUMP_COMMAND = b"dump\n"
+
+# How often to tell the device the time, so it can timestamp readings.
+EPOCH_SYNC_SECS = 60
+
 def constrain(v, mn, mx):
     if v >= mn and v <= mx:
         return v
@@ -18,11 +25,16 @@ class ReadLine:
     """
     Class to read bytes into a buffer and return buffer prefixes
     that end in a newline. Requires Serial.in_waiting.
+
+    readitem() also recognises the firmware's binary frames, which may
+    be interleaved with the text lines.
     """
 
     def __init__(self, stream):
         self.buf = bytearray()
         self.stream = stream
+        self.decoder = FrameDecoder()
+        self.bad_frames = 0
 
     def valid(self):
         return self.stream is not None 
@@ -47,20 +59,65 @@ class ReadLine:
                 #print(f"rl: extend with {data}")
                 self.buf.extend(data)
 
+    def readitem(self):
+        """
+        Return the next item from the stream: either a text line (bytes,
+        ending in a newline) or a decoded binary frame (dict).
+        """
+        while True:
+            if len(self.buf) > 0 and self.buf[0] == FRAME_SYNC:
+                # The payload length gives the frame length; anything else
+                # is taken as the shortest frame, and fails to decode.
+                length = FRAME_LENGTHS.get(self.buf[1], FRAME_LEN) if len(self.buf) > 1 else FRAME_LEN
+                if len(self.buf) >= length:
+                    with memoryview(self.buf) as mv, mv[:length] as frame:
+                        data = self.decoder.decode(frame)
+                    if data is not None:
+                        del self.buf[:length]
+                        return data
+
+                    # Corrupt, or not a frame at all: resynchronise on the
+                    # next thing that looks like the start of a frame or
+                    # a JSON line.
+                    self.bad_frames += 1
+                    print(f"Bad frame ({self.bad_frames} so far)", file=sys.stderr)
+                    starts = [i for i in (self.buf.find(FRAME_SYNC, 1), self.buf.find(b"{", 1)) if i > 0]
+                    del self.buf[:min(starts, default=len(self.buf))]
+                    continue
+            else:
+                i = self.buf.find(b"\n")
+                j = self.buf.find(FRAME_SYNC)
+                if j > 0 and (i < 0 or j < i):
+                    # The start of a line cut off by a frame; it can't
+                    # be completed, so drop it.
+                    del self.buf[:j]
+                    continue
+                if i >= 0:
+                    line = bytes(self.buf[:i+1])
+                    del self.buf[:i+1]
+                    return line
+
+            i = constrain(self.stream.in_waiting, 1, 2048)
+            self.buf.extend(self.stream.read(i))
+
 
 class LineItem:
     """
     Data class to be transmitted in a Queue instance to
-    a reader. Stores a status integer and a string.
+    a reader. Stores a status integer, a string and the host time
+    (unix epoch secs) at which the item was created. Binary frames are
+    passed already decoded, as 'data'.
     """
     OK = 1
 
     ENOPORT = 2  # unable to open port
     ETIMEOUT = 3
 
-    def __init__(self, stat: int = OK, line: str = ""):
+    def __init__(self, stat: int = OK, line: str = "", tod: float = None, data: dict = None):
         self.ln = line
         self.st = stat
+        self.tm = time.time() if tod is None else tod
+        self.dt = data
 
     @property
     def status(self):
@@ -70,13 +127,24 @@ class LineItem:
     def line(self):
         return self.ln
 
+    @property
+    def tod(self):
+        return self.tm
+
+    @property
+    def data(self):
+        return self.dt
 
-def SerialReadlineThread(out_queue, port, baud, nbits, parity, stopb):
+
+def SerialReadlineThread(out_queue, port, baud, nbits, parity, stopb, binary=False):
     """
     Long-lived thread that tries (repeatedly if needed) to open a serial
     port and read lines of text to insert into a Queue.
     If the serial port can't be opened, status messages are still added
     to the queue so the reaader can monitor.
+    If 'binary', the device is asked to send binary frames instead of
+    JSON lines. The device is told the time on opening the port and every
+    EPOCH_SYNC_SECS after, so its readings carry their Unix time.
     """
 
     def close_port(tty_in):
@@ -98,12 +166,21 @@ def SerialReadlineThread(out_queue, port, baud, nbits, parity, stopb):
     print("SerialReadlineThread started")
     tty_in = None
     readln = None
+    synced_at = 0
     while not SerialThreadPoison:
         try:
             if tty_in is None:
                 tty_in = open_port()
                 print(f"create tty_in {tty_in}", file=sys.stderr)
 
+                # Ask the device for the readings it buffered while we
+                # weren't listening, in binary if wanted.
+                if binary:
+                    tty_in.write(BINARY_COMMAND)
+                tty_in.write(epoch_command(time.time()))
+                synced_at = time.monotonic()
+                tty_in.write(DUMP_COMMAND)
+
             if tty_in is not None and readln is None:
                 #print(f"create readln", file=sys.stderr)
                 readln = ReadLine(tty_in)
@@ -115,12 +192,19 @@ def SerialReadlineThread(out_queue, port, baud, nbits, parity, stopb):
                 time.sleep(1) # 1s
             else:
                 #print(f"readline()", file=sys.stderr)
-                line = readln.readline()
-                text = line.decode('latin1')
-                item = LineItem(LineItem.OK, text)
+                line = readln.readitem()
+                if isinstance(line, dict):
+                    item = LineItem(LineItem.OK, data=line)
+                else:
+                    text = line.decode('latin1')
+                    item = LineItem(LineItem.OK, text)
                 #print(f"queue line Pre: {text}", file=sys.stderr)
                 out_queue.put(item)
 
+                if time.monotonic() - synced_at >= EPOCH_SYNC_SECS:
+                    tty_in.write(epoch_command(time.time()))
+                    synced_at = time.monotonic()
+
         except Exception as ex:
             print(f"Error: {ex}")
             #traceback.print_tb(ex.__traceback__, limit=3, file=sys.stderr)
@@ -0,0 +1,90 @@
+import struct
+
+# Binary reading frame sent by the firmware (see firmware/telemetry.py),
+# all little-endian:
+#
+#   0   sync byte (0xA5, never present in the JSON text)
+#   1   payload length (12, or 20 with epoch)
+#   2   seq: uint16, reading count since boot, wrapping
+#   4   temp: int16, 0.01 C
+#   6   humidity: uint16, 0.01 %RH
+#   8   status: uint16
+#   10  time: uint32, milliseconds since boot, wrapping
+#   14  epoch: int64, Unix time in milliseconds (only once the device
+#       has been sent set-epoch)
+#   14 or 22  CRC-16/CCITT-FALSE of bytes 1 up to it
+
+FRAME_SYNC = 0xA5
+FRAME_PAYLOAD = 12
+FRAME_LEN = 16
+FRAME_FORMAT = "<HhHHI"
+FRAME_EPOCH_PAYLOAD = 20
+FRAME_EPOCH_LEN = 24
+
+# Frame length, by payload length.
+FRAME_LENGTHS = {FRAME_PAYLOAD: FRAME_LEN, FRAME_EPOCH_PAYLOAD: FRAME_EPOCH_LEN}
+
+BINARY_COMMAND = b"binary\n"
+
+
+def epoch_command(secs: float) -> bytes:
+    """The command telling the device the Unix time is 'secs'."""
+    return f"set-epoch {int(round(secs * 1000))}\n".encode()
+
+
+def crc16(data) -> int:
+    """CRC-16/CCITT-FALSE (poly 0x1021, init 0xFFFF)."""
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ 0x1021) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+    return crc
+
+
+class FrameDecoder:
+    """
+    Decodes binary frames into the same dict a JSON reading line gives,
+    plus 'seq' and 'status', and 'epoch' if the frame has it. The 32-bit millisecond time wraps after
+    about 49 days, so wraps are undone here.
+    """
+
+    def __init__(self):
+        self.last_ms = None
+        self.wraps = 0
+
+    def decode(self, frame: memoryview) -> dict:
+        """
+        Decode one complete frame, or return None if it is corrupt.
+        """
+        length = FRAME_LENGTHS.get(frame[1])
+        if length is None or len(frame) < length:
+            return None
+
+        (crc,) = struct.unpack_from("<H", frame, length - 2)
+        if crc != crc16(frame[1:length - 2]):
+            return None
+
+        seq, temp, humidity, status, ms = struct.unpack_from(FRAME_FORMAT, frame, 2)
+
+        # A drop of more than half the range is a wrap. Smaller drops are
+        # older (buffered) readings or a reboot, and the clock tracking
+        # copes with those.
+        if self.last_ms is not None and self.last_ms - ms > 0x80000000:
+            self.wraps += 1
+        self.last_ms = ms
+
+        data = {
+            "seq": seq,
+            "time": ((self.wraps << 32) + ms) / 1000,
+            "temp": temp / 100,
+            "humidity": humidity / 100,
+            "status": status,
+        }
+        if length == FRAME_EPOCH_LEN:
+            (epoch_ms,) = struct.unpack_from("<q", frame, FRAME_LEN - 2)
+            data["epoch"] = epoch_ms / 1000
+        return data
@@ -27,32 +27,16 @@ out_filename="/var/run/node_exporter/textfile-collector/tempmon.prom"
 prefix = "airtemp_"
 
 
-def track_timestamp(data: dict, tod: float, starttime: float, start_tod: float):
-    if 'time' in data:
-        # Reset our state if needed.
-        if starttime < 0 or starttime > data['time']:   # first time round or rebooted
-            starttime, start_tod = data['time'], tod
-
-        # Calculate what time the sensor would tell if it had full
-        # unix epoch time available...
-        calc_tod = (data['time'] - starttime) + start_tod
-        diff = calc_tod - tod
-        if diff < -1.0 or diff > 0.5:
-            print(f"{get_tod()}: Time drifting: {diff}", file=sys.stderr)
-        if diff < -1.5 or diff > 1.0:
-            starttime = get_tod()
-            print(f"{get_tod()}: Time reset: was {diff}", file=sys.stderr)
-    return starttime, start_tod
-
-
-def try_get_input(serial_queue, tty_open, line):
+def try_get_input(serial_queue, tty_open, line, tod, timeout=1):
     # Try to read a line of text
     #print(f"Check queue:", file=sys.stderr)
     try:
-        item = serial_queue.get(block=True, timeout=1)
+        item = serial_queue.get(block=True, timeout=timeout)
         if item.status == LineItem.OK:
             #print(f"Got line {item.line}", file=sys.stderr)
-            line = item.line.rstrip()
+            # Binary frames come already decoded.
+            line = item.data if item.data is not None else item.line.rstrip()
+            tod = item.tod
             tty_open = True
 
         else:  # if item.status == LineItem.ENOPORT:
@@ -61,7 +45,7 @@ def try_get_input(serial_queue, tty_open, line):
     except queue.Empty:
         pass
 
-    return tty_open, line
+    return tty_open, line, tod
 
 
 def get_tod():
@@ -86,6 +70,8 @@ def main():
     argp.add_argument("-b", "--baud", action='store', metavar="BAUD", type=int, default=in_baud, help="Serial port baud rate (only if -T)")
     argp.add_argument("-o", "--promfile", action='store', default=out_filename, help="Full path to promfile to write to")
     argp.add_argument("-O", "--stdout", action='store_true', default=False, help="Write results to stdout as well as promfile")
+    argp.add_argument("-B", "--binary", action='store_true', default=False, help="Ask the device to send binary frames rather than JSON")
+    argp.add_argument("-t", "--timestamps", action='store_true', default=False, help="Add the estimated time of each reading to the promfile samples")
     args = argp.parse_args()
 
     print(f"Tempmon {__version__} (c) 2023 Ruth Ivimey-Cook")
@@ -97,13 +83,11 @@ def main():
     serial_queue = queue.SimpleQueue()
     serialIn = threading.Thread(
             target=SerialReadlineThread,
-            args=(serial_queue, args.serial, args.baud, in_nbits, in_parity, in_stopb),
+            args=(serial_queue, args.serial, args.baud, in_nbits, in_parity, in_stopb, args.binary),
             daemon=True)
     serialIn.start()
 
-    # value of data[time] and time.time() when last reset
-    starttime, start_tod = -1, get_tod()
-    promFile = PromFile(prefix, args.promfile, args)
+    promFile = PromFile(prefix, args.promfile, args, maxAge=maxPromfileAge)
 
     print(f"{get_tod()}: enter main loop", file=sys.stderr)
     tty_open = False
@@ -112,16 +96,19 @@ def main():
         tod = get_tod()
 
         try:
-            promFile.delete_expired_promfiles(maxAge=maxPromfileAge)
+            promFile.delete_expired_promfiles()
 
-            tty_open, line = try_get_input(serial_queue, tty_open, line)
+            # Don't wait on the queue past the promfile's expiry deadline.
+            timeout = promFile.time_to_expiry()
+            timeout = 1 if timeout is None else min(timeout, 1)
+
+            tty_open, line, tod = try_get_input(serial_queue, tty_open, line, tod, timeout)
 
             # If we haven't accumulated a complete line yet, that's all.
             if len(line) == 0:
                 continue
 
-            data = promFile.write_promfile(tty_open, line, tod)
-            starttime, start_tod = track_timestamp(data, tod, starttime, start_tod)
+            promFile.write_promfile(tty_open, line, tod)
 
         except KeyboardInterrupt as ex:
             raise ex
@@ -131,7 +118,10 @@ def main():
             time.sleep(0.25)
 
         sys.stderr.flush()
-        time.sleep(0.25)
+
+        # A batch arrives all at once, so take it without pausing.
+        if not promFile.in_batch:
+            time.sleep(0.25)
 
 
 if __name__ == '__main__':
@@ -28,7 +28,6 @@ Implementation Notes
 __version__ = "0.0.0+auto.0"
 __repo__ = "https://github.com/adafruit/Adafruit_CircuitPython_framebuf.git"
 
-import os
 import struct
 
 # Framebuf format constants:
@@ -39,6 +38,19 @@ MHMSB = 3  # Single bit displays like the Sharp Memory
 RGB888 = 4  # Neopixels and Dotstars
 GS2_HMSB = 5  # 2-bit color displays like the HT16K33 8x8 Matrix
 
+# Runs of each fill byte, grown to the longest asked for, to slice-assign
+# into buffers.
+_runs = {}
+
+
+def _run(fill, length):
+    """``length`` copies of the byte ``fill``, without making a new run each time."""
+    run = _runs.get(fill)
+    if run is None or len(run) < length:
+        run = bytes((fill,)) * length
+        _runs[fill] = run
+    return memoryview(run)[:length]
+
 
 class GS2HMSBFormat:
     """GS2HMSBFormat"""
@@ -73,7 +85,7 @@ class GS2HMSBFormat:
         else:
             fill = 0x00
 
-        framebuf.buf = [fill for i in range(len(framebuf.buf))]
+        framebuf.buf[:] = _run(fill, len(framebuf.buf))
 
     @staticmethod
     def rect(framebuf, x, y, width, height, color):
@@ -115,25 +127,34 @@ class MHMSBFormat:
     @staticmethod
     def fill(framebuf, color):
         """completely fill/clear the buffer with a color"""
-        if color:
-            fill = 0xFF
-        else:
-            fill = 0x00
-        for i in range(len(framebuf.buf)):  # pylint: disable=consider-using-enumerate
-            framebuf.buf[i] = fill
+        framebuf.buf[:] = _run(0xFF if color else 0x00, len(framebuf.buf))
 
     @staticmethod
     def fill_rect(framebuf, x, y, width, height, color):
         """Draw a rectangle at the given location, size and color. The ``fill_rect`` method draws
         both the outline and interior."""
         # pylint: disable=too-many-arguments
-        for _x in range(x, x + width):
-            offset = 7 - _x & 0x07
-            for _y in range(y, y + height):
-                index = (_y * framebuf.stride + _x) // 8
-                framebuf.buf[index] = (framebuf.buf[index] & ~(0x01 << offset)) | (
-                    (color != 0) << offset
-                )
+        # Each byte holds 8 columns of one row, the leftmost in the top
+        # bit: mask the partial bytes at each end of a row, and fill the
+        # whole bytes between in one go.
+        buf = framebuf.buf
+        x_end = x + width - 1
+        head = 0xFF >> (x & 0x07)
+        tail = (0xFF << (7 - (x_end & 0x07))) & 0xFF
+        for _y in range(y, y + height):
+            first = (_y * framebuf.stride + x) >> 3
+            last = (_y * framebuf.stride + x_end) >> 3
+            if first == last:
+                masks = ((first, head & tail),)
+            else:
+                masks = ((first, head), (last, tail))
+                if last - first > 1:
+                    buf[first + 1 : last] = _run(0xFF if color else 0x00, last - first - 1)
+            for index, mask in masks:
+                if color:
+                    buf[index] |= mask
+                else:
+                    buf[index] &= ~mask
 
 
 class MVLSBFormat:
@@ -158,27 +179,32 @@ class MVLSBFormat:
     @staticmethod
     def fill(framebuf, color):
         """completely fill/clear the buffer with a color"""
-        if color:
-            fill = 0xFF
-        else:
-            fill = 0x00
-        for i in range(len(framebuf.buf)):  # pylint: disable=consider-using-enumerate
-            framebuf.buf[i] = fill
+        framebuf.buf[:] = _run(0xFF if color else 0x00, len(framebuf.buf))
 
     @staticmethod
     def fill_rect(framebuf, x, y, width, height, color):
         """Draw a rectangle at the given location, size and color. The ``fill_rect`` method draws
         both the outline and interior."""
         # pylint: disable=too-many-arguments
-        while height > 0:
-            index = (y >> 3) * framebuf.stride + x
+        # Each byte holds 8 rows of one column, so set or clear the rows
+        # in each page the rectangle covers with one mask per byte.
+        buf = framebuf.buf
+        y_end = y + height
+        while y < y_end:
             offset = y & 0x07
-            for w_w in range(width):
-                framebuf.buf[index + w_w] = (
-                    framebuf.buf[index + w_w] & ~(0x01 << offset)
-                ) | ((color != 0) << offset)
-            y += 1
-            height -= 1
+            rows = min(8 - offset, y_end - y)
+            mask = ((1 << rows) - 1) << offset
+            index = (y >> 3) * framebuf.stride + x
+            if mask == 0xFF:
+                buf[index : index + width] = _run(0xFF if color else 0x00, width)
+            elif color:
+                for i in range(index, index + width):
+                    buf[i] |= mask
+            else:
+                mask = ~mask
+                for i in range(index, index + width):
+                    buf[i] &= mask
+            y += rows
 
 
 class RGB565Format:
@@ -338,18 +364,21 @@ class FrameBuffer:
         # pylint: disable=too-many-arguments, too-many-boolean-expressions
         self.rect(x, y, width, height, color, fill=True)
 
-    def pixel(self, x, y, color=None):
-        """If ``color`` is not given, get the color value of the specified pixel. If ``color`` is
-        given, set the specified pixel to the given color."""
+    def _rotate(self, x, y):
+        """Map a point from rotated to buffer coordinates."""
         if self.rotation == 1:
-            x, y = y, x
-            x = self.width - x - 1
+            return self.width - y - 1, x
         if self.rotation == 2:
-            x = self.width - x - 1
-            y = self.height - y - 1
+            return self.width - x - 1, self.height - y - 1
         if self.rotation == 3:
-            x, y = y, x
-            y = self.height - y - 1
+            return y, self.height - x - 1
+        return x, y
+
+    def pixel(self, x, y, color=None):
+        """If ``color`` is not given, get the color value of the specified pixel. If ``color`` is
+        given, set the specified pixel to the given color."""
+        if self.rotation:
+            x, y = self._rotate(x, y)
 
         if x < 0 or x >= self.width or y < 0 or y >= self.height:
             return None
@@ -431,32 +460,75 @@ class FrameBuffer:
             self.format.fill_rect(self, x_end, y, 1, y_end - y + 1, color)
 
     def line(self, x_0, y_0, x_1, y_1, color):
-        # pylint: disable=too-many-arguments
+        # pylint: disable=too-many-arguments,too-many-locals,too-many-branches
         """Bresenham's line algorithm"""
+        # Lines along an axis are rectangles 1 pixel wide.
+        if x_0 == x_1:
+            self.vline(x_0, min(y_0, y_1), abs(y_1 - y_0) + 1, color)
+            return
+        if y_0 == y_1:
+            self.hline(min(x_0, x_1), y_0, abs(x_1 - x_0) + 1, color)
+            return
+
+        # Rotate the ends once, then work in buffer coordinates.
+        if self.rotation:
+            x_0, y_0 = self._rotate(x_0, y_0)
+            x_1, y_1 = self._rotate(x_1, y_1)
+
+        width = self.width
+        height = self.height
         d_x = abs(x_1 - x_0)
         d_y = abs(y_1 - y_0)
         x, y = x_0, y_0
         s_x = -1 if x_0 > x_1 else 1
         s_y = -1 if y_0 > y_1 else 1
         if d_x > d_y:
-            err = d_x / 2.0
-            while x != x_1:
-                self.pixel(x, y, color)
+            steps = d_x
+            err = d_x >> 1
+        else:
+            steps = d_y
+            err = d_y >> 1
+
+        if isinstance(self.format, MVLSBFormat):
+            # Set the bits directly, as MVLSBFormat.set_pixel would.
+            buf = self.buf
+            stride = self.stride
+            for _ in range(steps + 1):
+                if 0 <= x < width and 0 <= y < height:
+                    if color:
+                        buf[(y >> 3) * stride + x] |= 1 << (y & 0x07)
+                    else:
+                        buf[(y >> 3) * stride + x] &= ~(1 << (y & 0x07))
+                if d_x > d_y:
+                    err -= d_y
+                    if err < 0:
+                        y += s_y
+                        err += d_x
+                    x += s_x
+                else:
+                    err -= d_x
+                    if err < 0:
+                        x += s_x
+                        err += d_y
+                    y += s_y
+            return
+
+        set_pixel = self.format.set_pixel
+        for _ in range(steps + 1):
+            if 0 <= x < width and 0 <= y < height:
+                set_pixel(self, x, y, color)
+            if d_x > d_y:
                 err -= d_y
                 if err < 0:
                     y += s_y
                     err += d_x
                 x += s_x
-        else:
-            err = d_y / 2.0
-            while y != y_1:
-                self.pixel(x, y, color)
+            else:
                 err -= d_x
                 if err < 0:
                     x += s_x
                     err += d_y
                 y += s_y
-        self.pixel(x, y, color)
 
     def blit(self):
         """blit is not yet implemented"""
@@ -557,9 +629,9 @@ class FrameBuffer:
 # Author: Tony DiCola
 # License: MIT License (https://opensource.org/licenses/MIT)
 class BitmapFont:
-    """A helper class to read binary font tiles and 'seek' through them as a
-    file to display in a framebuffer. We use file access so we dont waste 1KB
-    of RAM on a font!"""
+    """A helper class to read binary font tiles and draw them in a framebuffer.
+    The font is read into RAM once (1.3KB for the 5x8 font), and glyphs
+    scaled up for size > 1 are cached as they are first drawn."""
 
     def __init__(self, font_name="font5x8.bin"):
         # Specify the drawing area width and height, and the pixel function to
@@ -574,27 +646,25 @@ class BitmapFont:
         #            data (i.e. a 5x8 font has 5 bytes per character).
         self.font_name = font_name
 
-        # Open the font file and grab the character width and height values.
+        # Read the font file and grab the character width and height values.
         # Note that only fonts up to 8 pixels tall are currently supported.
         try:
-            self._font = open(  # pylint: disable=consider-using-with
-                self.font_name, "rb"
-            )
-            self.font_width, self.font_height = struct.unpack("BB", self._font.read(2))
-            # simple font file validation check based on expected file size
-            if 2 + 256 * self.font_width != os.stat(font_name)[6]:
-                raise RuntimeError("Invalid font file: " + font_name)
+            with open(self.font_name, "rb") as font:
+                self._data = memoryview(font.read())
         except OSError:
             print("Could not find font file", font_name)
             raise
-        except OverflowError:
-            # os.stat can throw this on boards without long int support
-            # just hope the font file is valid and press on
-            pass
+        self.font_width, self.font_height = struct.unpack_from("BB", self._data)
+        # simple font file validation check based on expected file size
+        if 2 + 256 * self.font_width != len(self._data):
+            raise RuntimeError("Invalid font file: " + font_name)
+        # Scaled glyph columns, by (character code, size).
+        self._scaled = {}
 
     def deinit(self):
-        """Close the font file as cleanup."""
-        self._font.close()
+        """Free the font data and glyph cache."""
+        self._data = None
+        self._scaled = {}
 
     def __enter__(self):
         """Initialize/open the font file"""
@@ -605,30 +675,71 @@ class BitmapFont:
         """cleanup on exit"""
         self.deinit()
 
+    def glyph(self, char, size=1):
+        """The pixel columns of a character, as integers with bit n set for
+        each lit pixel in row n, scaled up by ``size``."""
+        code = ord(char)
+        if code > 255:
+            return ()
+        start = 2 + code * self.font_width
+        columns = self._data[start : start + self.font_width]
+        if size == 1:
+            return columns
+        key = (code, size)
+        scaled = self._scaled.get(key)
+        if scaled is None:
+            block = (1 << size) - 1
+            scaled = []
+            for line in columns:
+                column = 0
+                for char_y in range(self.font_height):
+                    if (line >> char_y) & 0x1:
+                        column |= block << (char_y * size)
+                scaled.extend([column] * size)
+            scaled = tuple(scaled)
+            self._scaled[key] = scaled
+        return scaled
+
     def draw_char(
         self, char, x, y, framebuffer, color, size=1
     ):  # pylint: disable=too-many-arguments
         """Draw one character at position (x,y) to a framebuffer in a given color"""
         size = max(size, 1)
-        # Don't draw the character if it will be clipped off the visible area.
-        # if x < -self.font_width or x >= framebuffer.width or \
-        #   y < -self.font_height or y >= framebuffer.height:
-        #    return
+        columns = self.glyph(char, size)
+        if isinstance(framebuffer.format, MVLSBFormat) and framebuffer.rotation == 0:
+            # Each MVLSB byte is 8 rows of one column, so a glyph column
+            # is OR'd into (or masked out of) the bytes of the pages it
+            # overlaps.
+            buf = framebuffer.buf
+            stride = framebuffer.stride
+            pages = (framebuffer.height + 7) >> 3
+            for column in columns:
+                if 0 <= x < framebuffer.width:
+                    if y >= 0:
+                        column <<= y & 0x07
+                        page = y >> 3
+                    else:
+                        column >>= -y
+                        page = 0
+                    index = page * stride + x
+                    while column and page < pages:
+                        bits = column & 0xFF
+                        if bits:
+                            if color:
+                                buf[index] |= bits
+                            else:
+                                buf[index] &= ~bits
+                        column >>= 8
+                        page += 1
+                        index += stride
+                x += 1
+            return
         # Go through each column of the character.
-        for char_x in range(self.font_width):
-            # Grab the byte for the current column of font data.
-            self._font.seek(2 + (ord(char) * self.font_width) + char_x)
-            try:
-                line = struct.unpack("B", self._font.read(1))[0]
-            except RuntimeError:
-                continue  # maybe character isnt there? go to next
-            # Go through each row in the column byte.
-            for char_y in range(self.font_height):
-                # Draw a pixel for each bit that's flipped on.
-                if (line >> char_y) & 0x1:
-                    framebuffer.fill_rect(
-                        x + char_x * size, y + char_y * size, size, size, color
-                    )
+        for char_x, column in enumerate(columns):
+            # Draw a pixel for each bit that's flipped on.
+            for char_y in range(self.font_height * size):
+                if (column >> char_y) & 0x1:
+                    framebuffer.pixel(x + char_x, y + char_y, color)
 
     def width(self, text):
         """Return the pixel width of the specified text message."""
@@ -32,6 +32,7 @@ import time
 
 from micropython import const
 from adafruit_bus_device.i2c_device import I2CDevice
+from crc import crc8 as _crc, crc8_word
 
 try:
     from typing import List, Tuple, Union
@@ -117,31 +118,22 @@ _PERIODIC_COMMANDS = (
 _DELAY = ((REP_LOW, 0.0045), (REP_MED, 0.0065), (REP_HIGH, 0.0155))
 
 
-def _crc(data) -> int:
-    crc = 0xFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x80:
-                crc <<= 1
-                crc ^= 0x31
-            else:
-                crc <<= 1
-    return crc & 0xFF
-
-
 def _unpack(data: ReadableBuffer) -> List[int]:
+    # Each word is followed by its CRC. In periodic mode the buffer is
+    # only filled as far as the last pair whose first CRC is good, so
+    # find that, checking each CRC only once.
     length = len(data)
-    crc = [None] * (length // 3)
-    word = [None] * (length // 3)
+    count = length // 3
+    word = [None] * count
+    good = [False] * count
+    for i in range(count):
+        word[i], crc = struct.unpack_from(">HB", data, i * 3)
+        good[i] = crc == _crc(memoryview(data)[i * 3 : (i * 3) + 2])
     for i in range(length // 6):
-        word[i * 2], crc[i * 2], word[(i * 2) + 1], crc[(i * 2) + 1] = struct.unpack(
-            ">HBHB", data[i * 6 : (i * 6) + 6]
-        )
-        if crc[i * 2] == _crc(data[i * 6 : (i * 6) + 2]):
+        if good[i * 2]:
             length = (i + 1) * 6
     for i in range(length // 3):
-        if crc[i] != _crc(data[i * 3 : (i * 3) + 2]):
+        if not good[i]:
             raise RuntimeError("CRC mismatch")
     return word[: length // 3]
 
@@ -193,11 +185,17 @@ class SHT31D:
         self._last_read = 0
         self._cached_temperature = None
         self._cached_humidity = None
+        # Reused for every transfer so that reads don't allocate, and so
+        # don't provoke garbage collections that shift sample timing.
+        self._cmd = bytearray(2)
+        self._buffer = bytearray(6)
+        self._periodic_buffer = bytearray(48)
         self._reset()
 
     def _command(self, command: int) -> None:
+        struct.pack_into(">H", self._cmd, 0, command)
         with self.i2c_device as i2c:
-            i2c.write(struct.pack(">H", command))
+            i2c.write(self._cmd)
 
     def _reset(self) -> None:
         """
@@ -219,50 +217,110 @@ class SHT31D:
                 time.sleep(0.001)
                 self._last_read = 0
 
-    def _data(self) -> Union[Tuple[float, float], Tuple[List[float], List[float]]]:
+    def _data(self) -> None:
         if self.mode == MODE_PERIODIC:
-            data = bytearray(48)
+            data = self._periodic_buffer
             data[0] = 0xFF
             self._command(_SHT31_PERIODIC_FETCH)
             time.sleep(0.001)
+            with self.i2c_device as i2c:
+                i2c.readinto(data)
+            word = _unpack(data)
+            length = len(word)
+            temperature = [None] * (length // 2)
+            humidity = [None] * (length // 2)
+            for i in range(length // 2):
+                temperature[i] = -45 + (175 * (word[i * 2] / 65535))
+                humidity[i] = 100 * (word[(i * 2) + 1] / 65535)
+            if (len(temperature) == 1) and (len(humidity) == 1):
+                temperature, humidity = temperature[0], humidity[0]
+            self._cached_temperature, self._cached_humidity = temperature, humidity
         elif self.mode == MODE_SINGLE:
-            data = bytearray(6)
-            data[0] = 0xFF
-            for command in _SINGLE_COMMANDS:
-                if (
-                    self.repeatability == command[0]
-                    and self.clock_stretching == command[1]
-                ):
-                    self._command(command[2])
-            if not self.clock_stretching:
-                for delay in _DELAY:
-                    if self.repeatability == delay[0]:
-                        time.sleep(delay[1])
-            else:
-                time.sleep(0.001)
+            self.start_measurement()
+            time.sleep(self.measurement_delay)
+            self.read_measurement()
+
+    def start_measurement(self) -> None:
+        """
+        In 'Single' mode, start a measurement without waiting for it. Collect
+        it with :meth:`read_measurement` once :attr:`measurement_delay` has
+        passed.
+        """
+        for command in _SINGLE_COMMANDS:
+            if (
+                self.repeatability == command[0]
+                and self.clock_stretching == command[1]
+            ):
+                self._command(command[2])
+
+    @property
+    def measurement_delay(self) -> float:
+        """Seconds a 'Single' mode measurement takes at the current settings."""
+        if self.clock_stretching:
+            return 0.001
+        for delay in _DELAY:
+            if self.repeatability == delay[0]:
+                return delay[1]
+        return 0.0155
+
+    def read_measurement(self) -> None:
+        """
+        Read the result of a measurement started by :meth:`start_measurement`
+        into :attr:`cached_temperature` and :attr:`cached_humidity`.
+        Allocates nothing.
+        """
+        data = self._buffer
+        data[0] = 0xFF
         with self.i2c_device as i2c:
             i2c.readinto(data)
-        word = _unpack(data)
-        length = len(word)
-        temperature = [None] * (length // 2)
-        humidity = [None] * (length // 2)
-        for i in range(length // 2):
-            temperature[i] = -45 + (175 * (word[i * 2] / 65535))
-            humidity[i] = 100 * (word[(i * 2) + 1] / 65535)
-        if (len(temperature) == 1) and (len(humidity) == 1):
-            return temperature[0], humidity[0]
-        return temperature, humidity
-
-    def _read(self) -> Union[Tuple[float, float], Tuple[List[float], List[float]]]:
+        self._decode()
+
+    def fetch(self) -> bool:
+        """
+        In 'Periodic' mode, fetch the latest measurement into
+        :attr:`cached_temperature` and :attr:`cached_humidity` if the sensor
+        has taken one since the last fetch. Returns False, without waiting,
+        if it hasn't. Allocates nothing.
+        """
+        data = self._buffer
+        self._command(_SHT31_PERIODIC_FETCH)
+        try:
+            with self.i2c_device as i2c:
+                i2c.readinto(data)
+        except OSError:
+            # The sensor NACKs the read when there is no new measurement.
+            return False
+        self._decode()
+        return True
+
+    def _decode(self) -> None:
+        # A single reading is decoded in place, without the lists
+        # _unpack builds.
+        data = self._buffer
+        if data[2] != crc8_word(data, 0) or data[5] != crc8_word(data, 3):
+            raise RuntimeError("CRC mismatch")
+        self._cached_temperature = -45 + (175 * (((data[0] << 8) | data[1]) / 65535))
+        self._cached_humidity = 100 * (((data[3] << 8) | data[4]) / 65535)
+
+    @property
+    def cached_temperature(self) -> Union[float, List[float]]:
+        """The temperature from the last read or fetch, without reading the sensor."""
+        return self._cached_temperature
+
+    @property
+    def cached_humidity(self) -> Union[float, List[float]]:
+        """The humidity from the last read or fetch, without reading the sensor."""
+        return self._cached_humidity
+
+    def _read(self) -> None:
         if (
             self.mode == MODE_PERIODIC
             and time.time() > self._last_read + 1 / self.frequency
         ):
-            self._cached_temperature, self._cached_humidity = self._data()
+            self._data()
             self._last_read = time.time()
         elif self.mode == MODE_SINGLE:
-            self._cached_temperature, self._cached_humidity = self._data()
-        return self._cached_temperature, self._cached_humidity
+            self._data()
 
     @property
     def mode(self) -> Literal["Single", "Periodic"]:
@@ -363,8 +421,8 @@ class SHT31D:
         sensor's maximum output of 130.0 when the sensor is read before the
         cache is full.
         """
-        temperature, _ = self._read()
-        return temperature
+        self._read()
+        return self._cached_temperature
 
     @property
     def relative_humidity(self) -> Union[float, List[float]]:
@@ -376,8 +434,8 @@ class SHT31D:
         sensor's maximum output of 100.01831417975366 when the sensor is read
         before the cache is full.
         """
-        _, humidity = self._read()
-        return humidity
+        self._read()
+        return self._cached_humidity
 
     @property
     def heater(self) -> bool:
@@ -396,17 +454,16 @@ class SHT31D:
     @property
     def status(self) -> int:
         """Device status."""
-        data = bytearray(2)
+        data = self._buffer
         self._command(_SHT31_READSTATUS)
         time.sleep(0.001)
         with self.i2c_device as i2c:
-            i2c.readinto(data)
+            i2c.readinto(data, end=2)
         status = data[0] << 8 | data[1]
         return status
 
     def clearstatus(self):
         """Device status."""
-        data = bytearray(2)
         self._command(_SHT31_CLEARSTATUS)
         time.sleep(0.001)
 
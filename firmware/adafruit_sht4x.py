@@ -32,6 +32,7 @@ import time
 import struct
 from adafruit_bus_device import i2c_device
 from micropython import const
+from crc import crc8
 
 try:
     from typing import Tuple
@@ -190,15 +191,34 @@ class SHT4x:
     @property
     def measurements(self) -> Tuple[float, float]:
         """both `temperature` and `relative_humidity`, read simultaneously"""
+        self.start_measurement()
+        time.sleep(self.measurement_delay)
+        return self.read_measurement()
+
+    def start_measurement(self) -> None:
+        """
+        Start a measurement in the current mode without waiting for it.
+        Collect it with :meth:`read_measurement` once
+        :attr:`measurement_delay` has passed.
+        """
+        with self.i2c_device as i2c:
+            self._buffer[0] = self._mode
+            i2c.write(self._buffer, end=1)
 
+    @property
+    def measurement_delay(self) -> float:
+        """Seconds a measurement takes in the current mode"""
+        return Mode.delay[self._mode]
+
+    def read_measurement(self) -> Tuple[float, float]:
+        """
+        Read the result of a measurement started by :meth:`start_measurement`,
+        returning `temperature` and `relative_humidity`.
+        """
         temperature = None
         humidity = None
-        command = self._mode
 
         with self.i2c_device as i2c:
-            self._buffer[0] = command
-            i2c.write(self._buffer, end=1)
-            time.sleep(Mode.delay[self._mode])
             i2c.readinto(self._buffer)
 
         # separate the read data
@@ -233,12 +253,4 @@ class SHT4x:
     @staticmethod
     def _crc8(buffer) -> int:
         """verify the crc8 checksum"""
-        crc = 0xFF
-        for byte in buffer:
-            crc ^= byte
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = (crc << 1) ^ 0x31
-                else:
-                    crc = crc << 1
-        return crc & 0xFF  # return the bottom 8 bits
+        return crc8(buffer)
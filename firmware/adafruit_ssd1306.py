@@ -87,6 +87,9 @@ class _SSD1306(framebuf.FrameBuffer):
         # This is necessary because the underlying data buffer is different
         # between I2C and SPI implementations (I2C needs an extra byte).
         self._power = False
+        # What the display was last sent, so show() can send only what has
+        # changed since. None until the whole display has been sent.
+        self._sent = None
         # Parameters for efficient Page Addressing Mode (typical of U8Glib libraries)
         # Important as not all screens appear to support Horizontal Addressing Mode
         if self.page_addressing:
@@ -157,6 +160,7 @@ class _SSD1306(framebuf.FrameBuffer):
         ):
             self.write_cmd(cmd)
         self.fill(0)
+        self._sent = None
         self.show()
 
     def poweroff(self) -> None:
@@ -179,11 +183,16 @@ class _SSD1306(framebuf.FrameBuffer):
         self.write_cmd(SET_SEG_REMAP | (rotate & 1))
         # com output (vertical mirror) is changed immediately
         # you need to call show() for the seg remap to be visible
+        self._sent = None
 
     def write_framebuf(self) -> None:
         """Derived class must implement this"""
         raise NotImplementedError
 
+    def write_window(self, page: int, xpos0: int, xpos1: int) -> None:
+        """Derived class must implement this"""
+        raise NotImplementedError
+
     def write_cmd(self, cmd: int) -> None:
         """Derived class must implement this"""
         raise NotImplementedError
@@ -197,11 +206,80 @@ class _SSD1306(framebuf.FrameBuffer):
             time.sleep(0.010)
             self.reset_pin.value = 1
             time.sleep(0.010)
+            self._sent = None
         self.write_cmd(SET_DISP | 0x01)
         self._power = True
 
+    def changed(self) -> Optional[list]:
+        """The parts of the framebuffer that differ from what the display was
+        last sent, as a list of (page, first column, last column), or None if
+        it is simpler to send the whole framebuffer."""
+        if self._sent is None:
+            return None
+        buf = self.buf
+        sent = self._sent
+        width = self.width
+        changed = []
+        count = 0
+        for page in range(self.pages):
+            start = page * width
+            end = start + width
+            if buf[start:end] == sent[start:end]:
+                continue
+            # Close in on the changed columns 8 at a time, then singly.
+            first = start
+            while buf[first : first + 8] == sent[first : first + 8]:
+                first += 8
+            while buf[first] == sent[first]:
+                first += 1
+            last = end
+            while buf[last - 8 : last] == sent[last - 8 : last]:
+                last -= 8
+            last -= 1
+            while buf[last] == sent[last]:
+                last -= 1
+            changed.append((page, first - start, last - start))
+            count += last - first + 1
+        # Each window costs 6 commands; past this it's no saving.
+        if count > len(buf) * 3 // 4:
+            return None
+        return changed
+
     def show(self) -> None:
-        """Update the display"""
+        """Update the display, sending only the pages and columns that have
+        changed since the last show()."""
+        changed = self.changed()
+        if changed is None:
+            self.show_all()
+        else:
+            for page, xpos0, xpos1 in changed:
+                self.show_window(page, xpos0, xpos1)
+                start = page * self.width
+                self._sent[start + xpos0 : start + xpos1 + 1] = self.buf[
+                    start + xpos0 : start + xpos1 + 1
+                ]
+
+    def show_window(self, page: int, xpos0: int, xpos1: int) -> None:
+        """Send columns xpos0 to xpos1 of one page to the display"""
+        if self.page_addressing:
+            # Whole pages only; write_window sends from the page start.
+            xpos0, xpos1 = 0, self.width - 1
+        else:
+            if self.width != 128:
+                # narrow displays use centered columns
+                col_offset = (128 - self.width) // 2
+            else:
+                col_offset = 0
+            self.write_cmd(SET_COL_ADDR)
+            self.write_cmd(xpos0 + col_offset)
+            self.write_cmd(xpos1 + col_offset)
+            self.write_cmd(SET_PAGE_ADDR)
+            self.write_cmd(page)
+            self.write_cmd(page)
+        self.write_window(page, xpos0, xpos1)
+
+    def show_all(self) -> None:
+        """Send the whole framebuffer to the display"""
         if not self.page_addressing:
             xpos0 = 0
             xpos1 = self.width - 1
@@ -217,6 +295,9 @@ class _SSD1306(framebuf.FrameBuffer):
             self.write_cmd(0)
             self.write_cmd(self.pages - 1)
         self.write_framebuf()
+        if self._sent is None:
+            self._sent = bytearray(len(self.buf))
+        self._sent[:] = self.buf
 
 
 class SSD1306_I2C(_SSD1306):
@@ -253,6 +334,9 @@ class SSD1306_I2C(_SSD1306):
         # buffer).
         self.buffer = bytearray(((height // 8) * width) + 1)
         self.buffer[0] = 0x40  # Set first byte of data buffer to Co=0, D/C=1
+        # Data/command byte and up to one page, for partial updates.
+        self.windowbuffer = bytearray(width + 1)
+        self.windowbuffer[0] = 0x40
         super().__init__(
             memoryview(self.buffer)[1:],
             width,
@@ -286,6 +370,21 @@ class SSD1306_I2C(_SSD1306):
             with self.i2c_device:
                 self.i2c_device.write(self.buffer)
 
+    def write_window(self, page: int, xpos0: int, xpos1: int) -> None:
+        """Send part of one page of the frame buffer, after the data/command
+        byte, to the column and page window already set."""
+        if self.page_addressing:
+            self.write_cmd(0xB0 + page)
+            self.write_cmd(self.page_column_start[0])
+            self.write_cmd(self.page_column_start[1])
+        start = 1 + self.width * page
+        count = xpos1 - xpos0 + 1
+        self.windowbuffer[1 : count + 1] = memoryview(self.buffer)[
+            start + xpos0 : start + xpos1 + 1
+        ]
+        with self.i2c_device:
+            self.i2c_device.write(self.windowbuffer, end=count + 1)
+
 
 # pylint: disable-msg=too-many-arguments
 class SSD1306_SPI(_SSD1306):
@@ -350,3 +449,11 @@ class SSD1306_SPI(_SSD1306):
         self.dc_pin.value = 1
         with self.spi_device as spi:
             spi.write(self.buffer)
+
+    def write_window(self, page: int, xpos0: int, xpos1: int) -> None:
+        """Send part of one page of the frame buffer to the column and page
+        window already set."""
+        start = self.width * page
+        self.dc_pin.value = 1
+        with self.spi_device as spi:
+            spi.write(self.buffer, start=start + xpos0, end=start + xpos1 + 1)
@@ -1,6 +1,6 @@
 from time import sleep
 from sensor import BaseSensor
-import adafruit_am2320_ext
+import rivimey_am2320_cached
 
 
 class AM23(BaseSensor):
@@ -10,11 +10,13 @@ class AM23(BaseSensor):
     def __init__(self, bus, opts):
         super().__init__(bus, opts)
         self.am2320 = None
+        self.reading = False
         for c in range(1, 2):
             try:
-                am2320 = adafruit_am2320_ext.AM2320Cached(self.bus)
+                am2320 = rivimey_am2320_cached.AM2320Cached(self.bus)
                 print(f"Loaded AM2320 model: {am2320.model}, id: {am2320.device_id}")
                 print(f"Caching driver in use, expiry: {am2320.expiry}")
+                self.am2320 = am2320
                 break
             except Exception as ex:
                 print(f"Exception: On connect to sensor: {ex}")
@@ -22,6 +24,23 @@ class AM23(BaseSensor):
                 sleep(0.5)
 
 
+    def start_measurement(self):
+        # The driver caches values for ~2s, the least time between reads.
+        self.reading = self.am2320.expired
+        if self.reading:
+            self.am2320.start_read()
+
+
+    def measurement_ready(self) -> bool:
+        return not self.reading or self.am2320.read_ready()
+
+
+    def fetch(self):
+        if self.reading:
+            self.reading = False
+            self.am2320.finish_read()
+
+
     @property
     def relhumidity(self) -> float:
         return self.am2320.relative_humidity
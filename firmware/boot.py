@@ -10,17 +10,28 @@ usb_hid.disable()
 import supervisor
 supervisor.runtime.autoreload = False
 
-# Disable devices only if button is not pressed.
+# Set HIDE_USB_DRIVE True (and ENABLE_LOG in code.py) to log readings:
+# the CIRCUITPY drive is then hidden from the host, so the firmware can
+# write its sample log, unless a button is held at reset (to edit the
+# code). The buttons pull the pin high when pressed. Off by default, so
+# the drive is always there to copy new code to.
+HIDE_USB_DRIVE = False
+
 import board
 import digitalio
 button_a = digitalio.DigitalInOut(board.D2)
 button_b = digitalio.DigitalInOut(board.D3)
 
-# button_a.direction = digitalio.Direction.INPUT
-# button_b.direction = digitalio.Direction.INPUT
-# button_a.pull = digitalio.Pull.DOWN
-# button_b.pull = digitalio.Pull.DOWN
+button_a.direction = digitalio.Direction.INPUT
+button_b.direction = digitalio.Direction.INPUT
+button_a.pull = digitalio.Pull.DOWN
+button_b.pull = digitalio.Pull.DOWN
+
+if HIDE_USB_DRIVE and not (button_a.value or button_b.value):
+    import storage
+    storage.disable_usb_drive()
+    storage.remount("/", readonly=False)
 
-# if button_a.value and button_b.value:
-#     import storage
-#     storage.disable_usb_drive()
+# code.py uses the buttons itself.
+button_a.deinit()
+button_b.deinit()
@@ -0,0 +1,125 @@
+INF = float("inf")
+
+
+class ChartColumns:
+    """
+    A chart's history of readings, kept as the first, last, lowest and
+    highest value in each of up to 'width' columns of 'secs' seconds.
+
+    Columns start 'interval' seconds (one reading) wide. When the history
+    no longer fits, neighbouring columns are merged in pairs, doubling
+    their width, until they are 'max_secs' wide; after that the oldest
+    columns are dropped. Each reading costs O(1), the occasional merge
+    O(width), and drawing is O(width) however long the history.
+
+    Column numbers are reading secs // column secs, so merging pairs
+    keeps the columns on the same time boundaries.
+    """
+
+    def __init__(self, width: int, interval: int, max_secs: int):
+        self.width = width
+        self.interval = max(interval, 1)
+        self.max_secs = max_secs
+        self.first = [0.0 for _ in range(width)]
+        self.last = [0.0 for _ in range(width)]
+        self.low = [INF for _ in range(width)]
+        self.high = [-INF for _ in range(width)]
+        self.count = [0 for _ in range(width)]
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        self.secs = self.interval
+        self.start = 0        # ring index of the oldest column
+        self.columns = 0      # columns in use
+        self.newest = 0       # column number of the newest column
+        # Changes whenever columns are merged or cleared, so a chart drawn
+        # from them must be redrawn.
+        self.generation += 1
+        for i in range(self.width):
+            self._empty(i)
+
+    def _empty(self, i: int):
+        self.low[i] = INF
+        self.high[i] = -INF
+        self.count[i] = 0
+
+    def __len__(self):
+        return self.columns
+
+    @property
+    def oldest(self) -> int:
+        """Column number of the oldest column."""
+        return self.newest - self.columns + 1
+
+    def index(self, number: int) -> int:
+        """Where column 'number' is kept."""
+        return (self.start + number - self.oldest) % self.width
+
+    def add(self, secs: int, value: float):
+        number = secs // self.secs
+        if self.columns == 0 or number - self.newest >= self.width:
+            self.clear()
+            number = secs // self.secs
+            self.newest = number
+            self.columns = 1
+        elif number < self.newest:
+            # Out of order; the chart can't go back.
+            return
+        while number > self.newest:
+            if self.columns == self.width:
+                if self.secs * 2 <= self.max_secs:
+                    self._merge()
+                    number = secs // self.secs
+                    continue
+                self._empty(self.start)
+                self.start = (self.start + 1) % self.width
+                self.columns -= 1
+            self.newest += 1
+            self.columns += 1
+
+        i = self.index(number)
+        if self.count[i] == 0:
+            self.first[i] = value
+        self.last[i] = value
+        self.low[i] = min(self.low[i], value)
+        self.high[i] = max(self.high[i], value)
+        self.count[i] += 1
+
+    def _merge(self):
+        """Merge pairs of columns into columns twice as wide."""
+        oldest = self.oldest
+        order = [self.index(n) for n in range(oldest, self.newest + 1)]
+        first = [self.first[i] for i in order]
+        last = [self.last[i] for i in order]
+        low = [self.low[i] for i in order]
+        high = [self.high[i] for i in order]
+        count = [self.count[i] for i in order]
+        for i in range(self.width):
+            self._empty(i)
+
+        self.secs *= 2
+        self.start = 0
+        self.newest //= 2
+        self.columns = self.newest - oldest // 2 + 1
+        self.generation += 1
+        for k in range(len(order)):
+            if count[k] == 0:
+                continue
+            i = (oldest + k) // 2 - oldest // 2
+            if self.count[i] == 0:
+                self.first[i] = first[k]
+            self.last[i] = last[k]
+            self.low[i] = min(self.low[i], low[k])
+            self.high[i] = max(self.high[i], high[k])
+            self.count[i] += count[k]
+
+    def lowest(self):
+        """The lowest value in the chart, or None if empty."""
+        low = min(self.low)
+        return None if low == INF else low
+
+    def highest(self):
+        """The highest value in the chart, or None if empty."""
+        high = max(self.high)
+        return None if high == -INF else high
@@ -1,65 +1,189 @@
+from array import array
+from reading import Reading
+
+# Readings are kept as fixed point, in hundredths.
+FIXED_POINT = 100
+
+# Times are kept as milliseconds since boot, modulo 2**32 (49 days), and
+# unwrapped against the newest reading's full time.
+TIME_MASK = 0xFFFFFFFF
+
+# Status -1 (no reading) as kept in an unsigned 16-bit slot.
+NO_STATUS = 0xFFFF
+
 
 class CircularBufferIterator:
     def __init__(self, sequ):
-        self._index = sequ.old
-        self._count = 0
+        self._index = 0
         self._sequ = sequ
-        # print(f"__init: _index={self._index}, old={self._sequ.old}, new={self._sequ.new}")
 
     def __next__(self):
-        nextindex = (self._index + 1) % self._sequ.cap
-        if self._sequ.is_empty() or (nextindex == self._sequ.new):
+        if self._index >= len(self._sequ):
             raise StopIteration
 
-        item = self._sequ.buffer[self._index]
-        self._index = nextindex
-        self._count += 1
-        # print(f"__next: _index={self._index}, _count={self._count}, new={self._sequ.new}, item={item.json}")
+        item = self._sequ[self._index]
+        self._index += 1
         return item
 
 
+class MonotonicQueue:
+    """
+    The min (or, if 'largest', the max) of a sliding window of values,
+    in O(1) per value. Only values that could yet become the min are kept,
+    in order, with the serial number they were added as: a new value
+    removes every larger value before it, and values leave the front as
+    their serial drops out of the window. Values are kept in an array of
+    'typecode'.
+    """
+
+    def __init__(self, capacity, largest=False, typecode="h"):
+        self.serials = array("L", [0] * capacity)
+        self.values = array(typecode, [0] * capacity)
+        self.head = 0
+        self.len = 0
+        self.cap = capacity
+        self.largest = largest
+
+    def push(self, serial, value):
+        while self.len > 0:
+            tail = self.values[(self.head + self.len - 1) % self.cap]
+            if (tail > value) if self.largest else (tail < value):
+                break
+            self.len -= 1
+        end = (self.head + self.len) % self.cap
+        self.serials[end] = serial
+        self.values[end] = value
+        self.len += 1
+
+    def expire(self, first):
+        """Forget values added before serial 'first'."""
+        while self.len > 0 and self.serials[self.head] < first:
+            self.head = (self.head + 1) % self.cap
+            self.len -= 1
+
+    def clear(self):
+        self.head = self.len = 0
+
+    @property
+    def value(self):
+        return self.values[self.head] if self.len > 0 else None
+
+
 class CircularBuffer:
+    """
+    The last 'capacity' readings, kept as a struct of arrays: 12 bytes a
+    reading against a couple of hundred for a Reading object. Indexing
+    and iteration give Reading objects, oldest first. The per-reading
+    stats aren't kept, and temperature and humidity are kept to 0.01.
+
+    lowest() and highest() give the min and max temperature held without
+    a rescan.
+    """
 
     def __init__(self, capacity):
-        self.buffer = [None for _ in range(capacity)]
+        self.millisecs = array("L", [0] * capacity)
+        self.temps = array("h", [0] * capacity)
+        self.humidities = array("h", [0] * capacity)
+        self.statuses = array("H", [0] * capacity)
+        self.seqs = array("H", [0] * capacity)
         self.new = 0
         self.old = 0
         self.size = 0
         self.cap = capacity
 
-    def read(self):
-        value = self.buffer[self.old]
-        if value is None:
-            raise Exception("CircularBuffer is empty")
-        self.buffer[self.old] = None
-        self.old = (self.old + 1) % len(self.buffer)
+        # The full time of the newest reading, to unwrap the others by.
+        self.newest_ms = 0
+
+        # Readings are numbered as they're written: 'first' is the number
+        # of the oldest still here, 'serial' the number of the next.
+        self.first = 0
+        self.serial = 0
+        self.low = MonotonicQueue(capacity)
+        self.high = MonotonicQueue(capacity, largest=True)
+
+    def _dropped(self):
+        self.old = (self.old + 1) % self.cap
         self.size -= 1
+        self.first += 1
+        self.low.expire(self.first)
+        self.high.expire(self.first)
+
+    def _store(self, value: Reading):
+        i = self.new
+        ms = value.millisecs
+        temp = int(round(value.temp * FIXED_POINT))
+        self.millisecs[i] = ms & TIME_MASK
+        self.temps[i] = temp
+        self.humidities[i] = int(round(value.humidity * FIXED_POINT))
+        self.statuses[i] = value.status & NO_STATUS
+        self.seqs[i] = value.seq
+        self.newest_ms = ms
+
+        self.low.push(self.serial, temp)
+        self.high.push(self.serial, temp)
+        self.serial += 1
+        self.new = (self.new + 1) % self.cap
+        self.size += 1
+
+    def read(self) -> Reading:
+        if self.is_empty():
+            raise Exception("CircularBuffer is empty")
+        value = self[0]
+        self._dropped()
         return value
 
-    def write(self, data):
+    def write(self, data: Reading):
         """Non-overwriting version - on full raises exception."""
-        if self.buffer[self.new] is not None:
+        if self.is_full():
             raise Exception("CircularBuffer is full")
-        self.buffer[self.new] = data
-        self.new = (self.new + 1) % self.cap
-        self.size -= 1
+        self._store(data)
 
-    def overwrite(self, data):
+    def overwrite(self, data: Reading):
         """Overwriting version - on full loses oldest data."""
-        # The condition new == old is ambiguous, repr either full or empty.
-        # We're using a size value to disambiguate this, but an alternative
-        # is to reserve the entry at new==old as an always unused slot, and
-        # then new+1 == old becomes 'full' while new == old is empty.
-        if self.is_full() and not self.is_empty():
-            self.size -= 1   # repr loss of oldest
-            self.old = (self.old + 1) % self.cap
-        self.buffer[self.new] = data
-        self.new = (self.new + 1) % self.cap
-        self.size += 1
-        # print(self)
+        if self.is_full():
+            self._dropped()
+        self._store(data)
+
+    def __getitem__(self, n: int) -> Reading:
+        """Reading 'n', counting from 0 for the oldest, or back from -1 for the newest."""
+        if n < 0:
+            n += self.size
+        if n < 0 or n >= self.size:
+            raise IndexError("CircularBuffer index out of range")
+        i = (self.old + n) % self.cap
+        newest = (self.new - 1) % self.cap
+        ms = self.newest_ms - ((self.millisecs[newest] - self.millisecs[i]) & TIME_MASK)
+        status = self.statuses[i]
+        return Reading(ms * 1_000,
+                       self.temps[i] / FIXED_POINT,
+                       self.humidities[i] / FIXED_POINT,
+                       -1 if status == NO_STATUS else status,
+                       self.seqs[i])
+
+    def latest(self) -> Reading:
+        """The most recently written reading, or None if empty."""
+        if self.is_empty():
+            return None
+        return self[-1]
+
+    def oldest(self) -> Reading:
+        """The oldest reading still held, or None if empty."""
+        if self.is_empty():
+            return None
+        return self[0]
+
+    def lowest(self) -> float:
+        """The lowest temperature held, or None if empty."""
+        low = self.low.value
+        return None if low is None else low / FIXED_POINT
+
+    def highest(self) -> float:
+        """The highest temperature held, or None if empty."""
+        high = self.high.value
+        return None if high is None else high / FIXED_POINT
 
     def is_full(self):
-        return self.old == self.new
+        return self.size == self.cap
 
     def is_empty(self):
         return self.size == 0
@@ -67,8 +191,9 @@ class CircularBuffer:
     def clear(self):
         self.old = self.new = 0
         self.size = 0
-        for i in range(self.cap):
-            self.buffer[i] = None
+        self.first = self.serial = 0
+        self.low.clear()
+        self.high.clear()
 
     def __len__(self):
         return self.size
@@ -1,9 +1,11 @@
-from time import sleep, monotonic_ns
-from math import floor, ceil
+from time import monotonic, monotonic_ns
+import asyncio
+import gc
+import alarm
 import board
-import digitalio
 import busio
-## import async_button
+import keypad
+import storage
 
 from sensor import BaseSensor
 from reading import Reading
@@ -13,8 +15,14 @@ from am23 import AM23
 from sht3x import SHT3x
 from usbserial import USBSerial
 from circularbuffer import CircularBuffer
+from chartcolumns import ChartColumns
+from rollup import Rollup
+from samplelog import SampleLog
+from epochclock import EpochClock
 
-BUFFER_MAX = 64  # samples
+BUFFER_MAX = 720  # samples, 12 bytes each
+
+SEQ_MODULUS = 0x10000   # reading sequence numbers are 16 bits
 
 # Hardware present:
 ENABLE_OLED = True
@@ -23,42 +31,133 @@ ENABLE_SHT3x = True
 ENABLE_NEOPIXEL = True
 ENABLE_SERIAL = True
 
+# Log readings to the filesystem; only works when boot.py has hidden the
+# USB drive, so set HIDE_USB_DRIVE there True as well. Each file holds up
+# to LOG_MAX_BYTES (16 bytes a reading, so 128KB is 8192 readings, 11
+# hours at one every 5s), and one old file is kept besides.
+ENABLE_LOG = False
+LOG_PATH = "/samples.log"
+LOG_MAX_BYTES = 128 * 1024
+
 INITIAL_CHARTMODE = True
 
+# Light-sleep between readings rather than idling in asyncio. The host
+# link stays up, but host commands are only seen once the device wakes
+# (at worst one reading interval later), and the SHT3x is run single-shot
+# as the periodic mode needs polling while asleep.
+LOW_POWER = False
+
+# Run the SHT3x in periodic mode at this rate (0.5, 1, 2, 4 or 10 Hz, or
+# "art"), reporting the mean of the measurements in each reading
+# interval. None for a single-shot measurement per reading.
+SHT3x_FREQUENCY = 2
+
 READING_INTERVAL_MILLISECS = 5_000
 
+# The host may change the interval (set-interval) within these limits.
+READING_INTERVAL_MIN_MILLISECS = 1_000
+READING_INTERVAL_MAX_MILLISECS = 3_600_000
+
+# The OLED chart shows up to this much history, as min/max bars once there
+# are more readings than pixel columns.
+CHART_HISTORY_SECS = 3 * 3600
+
+# Besides the buffer of readings, the min, mean and max of each minute
+# and hour are kept for this many minutes and hours (22 bytes each).
+ROLLUP_MINUTES = 24 * 60
+ROLLUP_HOURS = 7 * 24
+
 MILLISECS_TO_NANOSECS = 1_000_000
 MICROSECS_TO_NANOSECS = 1_000
 
+MILLISECS_TO_SECS = 1_000
 MICROSECS_TO_SECS = 1_000_000
 MICROSECS_TO_MILLISECS = 1_000
 NANOSECS_TO_MILLISECS = 1_000_000
 NANOSECS_TO_MICROSECS = 1_000
+NANOSECS_TO_SECS = 1_000_000_000
+
+# Buttons held at least this long make a long press.
+BUTTON_LONG_PRESS_MILLISECS = 1_000
+
+# keypad scans the buttons by itself; this is how long they must be
+# steady to count as a change.
+BUTTON_DEBOUNCE_MILLISECS = 20
+
+# keypad event timestamps are supervisor.ticks_ms(), which wraps at 2**29.
+TICKS_MASK = (1 << 29) - 1
+
+# How often each task runs. Outputs run when there is a new reading, but
+# no more often than this.
+NEOPIXEL_PERIOD_MILLISECS = 1_000
+SERIAL_PERIOD_MILLISECS = 0
+BUTTON_PERIOD_MILLISECS = 20
+HOST_PERIOD_MILLISECS = 20
+SENSOR_POLL_PERIOD_MILLISECS = 10
+MEASUREMENT_POLL_MILLISECS = 1
+
+# The OLED redraws when what it shows changes, but no more often than
+# this, however fast the readings come.
+OLED_FRAME_MILLISECS = 250
 
-NAP_TIME_MICROSECS = 20     # 20us or thereabouts.
-NAP_TIME_SECS = float(NAP_TIME_MICROSECS) / float(MICROSECS_TO_SECS)
-BUTTON_PRESS_MILLISECS = 50  # approximate!
+# Wake this much early from light sleep and asyncio.sleep() the rest, so
+# the coarser float alarm time doesn't move the reading schedule.
+LIGHT_SLEEP_MARGIN_MILLISECS = 10
+
+# Not worth going to sleep for less than this.
+LIGHT_SLEEP_MIN_MILLISECS = 50
+
+# After a button wakes the device, stay awake this long for keypad to
+# see the press.
+LIGHT_SLEEP_BUTTON_MILLISECS = 3 * BUTTON_DEBOUNCE_MILLISECS
+
+# Give up on a sensor measurement that hasn't finished in this time.
+MEASUREMENT_TIMEOUT_NANOSECS = 100 * MILLISECS_TO_NANOSECS
 
 opts = {
     "oled_reversevideo": True,
-    "usbdrive_visible": False,
+    "oled_incremental": True,   # scroll the chart rather than redraw it
+    "chart_columns": True,      # chart the long history, else the buffer
+    "chart_rollup": None,       # else chart rollups[n] in place of either
+    # The firmware can only write the filesystem if the host can't.
+    "usbdrive_visible": storage.getmount("/").readonly,
     "serialto_console": False,  # else to COM2
     "chartmode": INITIAL_CHARTMODE,
+    "sht3x_frequency": None if LOW_POWER else SHT3x_FREQUENCY,
+    "reading_interval_millisecs": READING_INTERVAL_MILLISECS,
 }
 
 # Global state:
 i2c = None
 
-# Buffer to store last N readings in.
+# Buffer to store last N readings in. It keeps the min & max temperature
+# for the chart.
 buffer = CircularBuffer(BUFFER_MAX)
 
-# Initialise the Buttions
-button_a = digitalio.DigitalInOut(board.D3)
-button_a.direction = digitalio.Direction.INPUT
-button_a.pull = digitalio.Pull.DOWN
-button_b = digitalio.DigitalInOut(board.D2)
-button_b.direction = digitalio.Direction.INPUT
-button_b.pull = digitalio.Pull.DOWN
+# The long history for the chart.
+columns = ChartColumns(SSD1306.CHART_COLUMNS, READING_INTERVAL_MILLISECS // MILLISECS_TO_SECS,
+                       CHART_HISTORY_SECS // SSD1306.CHART_COLUMNS)
+
+# Per-minute and per-hour history, for the chart and the host.
+rollups = (Rollup(ROLLUP_MINUTES, 60), Rollup(ROLLUP_HOURS, 3600))
+
+# Initialise the Buttons: a is key 0, b is key 1. They pull the pin high
+# when pressed, so keypad enables the pull-downs.
+BUTTON_PINS = (board.D3, board.D2)
+
+
+def make_buttons():
+    return keypad.Keys(BUTTON_PINS, value_when_pressed=True, pull=True,
+                       interval=BUTTON_DEBOUNCE_MILLISECS / MILLISECS_TO_SECS)
+
+
+buttons = make_buttons()
+
+# When each button now held was pressed, by key number.
+button_pressed_at = {}
+
+# Either button wakes the device from light sleep.
+button_alarms = [alarm.pin.PinAlarm(pin, value=True, pull=True) for pin in BUTTON_PINS]
 
 # The AM2320 chip tops at 100KHz. The SHT30 can do 1MHz.
 i2c = busio.I2C(board.SCL, board.SDA, frequency=400_000)
@@ -70,66 +169,370 @@ if ENABLE_AM2320:
 elif ENABLE_SHT3x:
     sensor = SHT3x(i2c, opts)
 
-outputs = []
+# Unix time, once the host has sent set-epoch.
+clock = EpochClock()
+
 if ENABLE_SERIAL:
-    serial = USBSerial(opts)
-    outputs.append(serial)
+    serial = USBSerial(opts, clock)
+
+if ENABLE_LOG:
+    samplelog = SampleLog(opts, LOG_PATH, LOG_MAX_BYTES)
 
 if ENABLE_NEOPIXEL:
     neopixel = NeoPixel(board.NEOPIXEL, opts)
-    outputs.append(neopixel)
 
 if ENABLE_OLED:
-    oled = SSD1306(i2c, buffer, opts)
-    outputs.append(oled)
+    oled = SSD1306(i2c, buffer, opts, columns, rollups)
+
+
+def uptime() -> float:
+    """Seconds since start, as sent to the host."""
+    return round((monotonic_ns() - start) / NANOSECS_TO_SECS, 6)
+
+
+async def poll_host():
+    """
+    Act on any commands the host has sent. Only the dumps take a while,
+    and they let the other tasks run as they go; commands sent meanwhile
+    wait for the dump to finish.
+
+    A command is a line of its name, then any argument after a space.
+    Commands that change or report settings answer with a JSON line
+    (see USBSerial.reply), as does any command that fails. Commands
+    that send a dump are async, and are awaited.
+    """
+    while not serial.dumping:
+        line = serial.read_command()
+        if line is None:
+            return
+        name, _, arg = line.partition(" ")
+        if not name:
+            continue
+        command = host_commands.get(name)
+        try:
+            if command is None:
+                raise ValueError("unknown command")
+            dump = command(arg.strip())
+            if dump is not None:
+                await dump
+        except Exception as ex:
+            serial.reply(name, {"error": str(ex)})
+
+
+# The host asks for the buffered readings, and may ask for binary
+# frames, when it (re)connects.
+async def cmd_dump(arg: str):
+    await serial.dump(buffer, uptime())
+
+
+def cmd_binary(arg: str):
+    serial.binary = True
+
+
+def cmd_text(arg: str):
+    serial.binary = False
+
+
+async def cmd_minutes(arg: str):
+    await serial.dump_rollup(rollups[0], uptime())
+
+
+async def cmd_hours(arg: str):
+    await serial.dump_rollup(rollups[1], uptime())
+
+
+async def cmd_log(arg: str):
+    if not ENABLE_LOG:
+        raise ValueError("no log")
+    await serial.dump_log(samplelog, uptime())
+
+
+def cmd_set_interval(arg: str):
+    """set-interval MILLISECS: the time between readings, from the next one on."""
+    ms = int(arg)
+    if not READING_INTERVAL_MIN_MILLISECS <= ms <= READING_INTERVAL_MAX_MILLISECS:
+        raise ValueError(f"interval must be {READING_INTERVAL_MIN_MILLISECS} to {READING_INTERVAL_MAX_MILLISECS} ms")
+    opts["reading_interval_millisecs"] = ms
+    serial.reply("set-interval", {"interval": ms})
+
+
+def cmd_set_repeatability(arg: str):
+    """set-repeatability high|medium|low: the SHT3x measurement repeatability."""
+    sensor.repeatability = arg.capitalize()
+    serial.reply("set-repeatability", {"repeatability": sensor.repeatability})
+
+
+def device_millisecs() -> int:
+    """Milliseconds since start, the device time readings carry."""
+    return (monotonic_ns() - start) // NANOSECS_TO_MILLISECS
 
-# We want to avoid drift so 'now' is captured and then
-# compared to clock-now, rather than a simple sleep(n).
-now = monotonic_ns()
 
-start = now
-step = READING_INTERVAL_MILLISECS * MILLISECS_TO_NANOSECS
+def cmd_set_epoch(arg: str):
+    """set-epoch MILLISECS: the host's Unix time now, in milliseconds."""
+    clock.sync(int(arg), device_millisecs())
+    serial.reply("set-epoch", {"epoch": clock.epoch_ms(device_millisecs()), "ppm": clock.ppm})
 
-while True:
-    us = int((now - start) / NANOSECS_TO_MICROSECS)
 
+def cmd_read_status(arg: str):
+    serial.reply("read-status", {
+        "time": uptime(),
+        "epoch": clock.epoch_ms(device_millisecs()),
+        "seq": None if latest is None else latest.seq,
+        "interval": opts["reading_interval_millisecs"],
+        "sensor": sensor.exists,
+        "repeatability": sensor.repeatability,
+        "frequency": opts["sht3x_frequency"],
+        "buffer": len(buffer),
+        "log": len(samplelog) if ENABLE_LOG and samplelog.exists else None,
+        "binary": serial.binary,
+        "mem_free": gc.mem_free(),
+    })
+
+
+host_commands = {
+    "dump": cmd_dump,
+    "dump-buffer": cmd_dump,
+    "binary": cmd_binary,
+    "text": cmd_text,
+    "minutes": cmd_minutes,
+    "hours": cmd_hours,
+    "log": cmd_log,
+    "set-interval": cmd_set_interval,
+    "set-repeatability": cmd_set_repeatability,
+    "set-epoch": cmd_set_epoch,
+    "read-status": cmd_read_status,
+}
+
+
+def millisecs(ms: int) -> float:
+    """asyncio.sleep() time for 'ms' milliseconds."""
+    return ms / MILLISECS_TO_SECS
+
+
+async def take_reading(us: int, seq: int) -> Reading:
+    """
+    Measure, letting other tasks run while the sensor converts.
+    """
     status = -1
     t, h = 0, 0
+    stats = None
     try:
         if sensor.exists:
+            sensor.start_measurement()
+            timeout = monotonic_ns() + MEASUREMENT_TIMEOUT_NANOSECS
+            while not sensor.measurement_ready():
+                if monotonic_ns() > timeout:
+                    raise RuntimeError("sensor measurement timed out")
+                await asyncio.sleep(millisecs(MEASUREMENT_POLL_MILLISECS))
+            sensor.fetch()
+
             t = round(sensor.celcius, 3)
             h = round(sensor.relhumidity, 3)
+            stats = sensor.stats
             status = sensor.status
     except Exception as ex:
         print(f"Exception thrown reading sensor: {ex}")
+    sensor.new_window()
+
+    return Reading(us, t, h, status, seq, stats, clock.epoch_ms(us // MICROSECS_TO_MILLISECS))
+
+
+async def sample_task(events: list):
+    """
+    Take a reading every opts["reading_interval_millisecs"] and tell the
+    outputs.
+    """
+    # We want to avoid drift so 'now' is advanced by whole steps and
+    # compared to clock-now, rather than a simple sleep(n).
+    now = start
+
+    # Each reading is numbered so the host can tell if any went missing.
+    seq = 0
+
+    while True:
+        us = (now - start) // NANOSECS_TO_MICROSECS
+        reading = await take_reading(us, seq)
+        seq = (seq + 1) % SEQ_MODULUS
+        buffer.overwrite(reading)
+        if reading.status != -1:
+            columns.add(reading.secs, reading.temp)
+            for rollup in rollups:
+                rollup.add(reading.secs, reading.temp, reading.humidity)
+
+        global latest
+        latest = reading
+        for event in events:
+            event.set()
+
+        now = now + opts["reading_interval_millisecs"] * MILLISECS_TO_NANOSECS
+        await wait_until(now)
+
+
+async def wait_until(deadline: int):
+    """
+    Return at monotonic_ns() 'deadline', light-sleeping on the way if
+    LOW_POWER is set and nothing else needs to be awake.
+    """
+    sleep_min = LIGHT_SLEEP_MIN_MILLISECS * MILLISECS_TO_NANOSECS
+    margin = LIGHT_SLEEP_MARGIN_MILLISECS * MILLISECS_TO_NANOSECS
+    while True:
+        delay = deadline - monotonic_ns()
+        if delay <= 0:
+            return
+        if not LOW_POWER or delay < sleep_min + margin:
+            await asyncio.sleep(delay / NANOSECS_TO_SECS)
+        elif button_pressed_at or (ENABLE_SERIAL and serial.dumping):
+            # Stay awake to time the press, or finish the dump.
+            await asyncio.sleep(millisecs(BUTTON_PERIOD_MILLISECS))
+        else:
+            # Let the outputs deal with the last reading first.
+            await asyncio.sleep(0)
+            if ENABLE_SERIAL:
+                await poll_host()
+                if deadline - monotonic_ns() < sleep_min + margin:
+                    continue    # a dump took the time
+            if light_sleep(deadline - margin):
+                await asyncio.sleep(millisecs(LIGHT_SLEEP_BUTTON_MILLISECS))
+
+
+def light_sleep(until: int) -> bool:
+    """
+    Light-sleep until monotonic_ns() 'until' or a button is pressed.
+    Return True if a button woke us.
+    """
+    global buttons
+    handle_buttons()
+    if ENABLE_OLED:
+        oled.refresh()
+
+    # The alarms need the button pins, so keypad must let go of them.
+    buttons.deinit()
+    wake = monotonic() + (until - monotonic_ns()) / NANOSECS_TO_SECS
+    woke = alarm.light_sleep_until_alarms(alarm.time.TimeAlarm(monotonic_time=wake),
+                                          *button_alarms)
+    buttons = make_buttons()
+    return isinstance(woke, alarm.pin.PinAlarm)
+
+
+async def output_task(chan, event, period_ms: int):
+    """
+    Write each new reading to output 'chan', at most once per 'period_ms'.
+    A slow output only delays itself.
+    """
+    while True:
+        await event.wait()
+        event.clear()
+        try:
+            chan.write(latest)
+        except Exception as ex:
+            print(f"Exception thrown writing output: {ex}")
+        if period_ms > 0:
+            await asyncio.sleep(millisecs(period_ms))
+
+
+async def display_task(display):
+    """
+    Let 'display' redraw if it needs to, once per OLED_FRAME_MILLISECS.
+    """
+    while True:
+        try:
+            display.refresh()
+        except Exception as ex:
+            print(f"Exception thrown refreshing display: {ex}")
+        await asyncio.sleep(millisecs(OLED_FRAME_MILLISECS))
+
+
+async def sensor_poll_task():
+    """Let sensors that measure by themselves hand over their results."""
+    while True:
+        sensor.poll()
+        await asyncio.sleep(millisecs(SENSOR_POLL_PERIOD_MILLISECS))
+
+
+async def host_task():
+    while True:
+        await poll_host()
+        await asyncio.sleep(millisecs(HOST_PERIOD_MILLISECS))
+
+
+def handle_buttons():
+    """
+    Act on presses from the keypad event queue. button_actions[n] is a
+    pair of (short, long) press actions for key n; either may be None.
+    """
+    event = keypad.Event()
+    while buttons.events.get_into(event):
+        key = event.key_number
+        if event.pressed:
+            button_pressed_at[key] = event.timestamp
+        elif key in button_pressed_at:
+            held = (event.timestamp - button_pressed_at.pop(key)) & TICKS_MASK
+            short, long = button_actions[key]
+            action = long if held >= BUTTON_LONG_PRESS_MILLISECS else short
+            if action is not None:
+                action()
+
+
+async def button_task():
+    while True:
+        handle_buttons()
+        await asyncio.sleep(millisecs(BUTTON_PERIOD_MILLISECS))
+
+
+def toggle_opt(name: str):
+    def toggle():
+        opts[name] = not opts[name]
+    return toggle
+
+
+def cycle_chart_rollup():
+    # The chart shows the buffer or long history, then each rollup in turn.
+    n = opts["chart_rollup"]
+    n = 0 if n is None else n + 1
+    opts["chart_rollup"] = n if n < len(rollups) else None
+
+
+def toggle_reversevideo():
+    opts["oled_reversevideo"] = not opts["oled_reversevideo"]
+    if ENABLE_OLED and oled.exists:
+        oled.reversevideo = opts["oled_reversevideo"]
+
+
+button_actions = (
+    (toggle_opt("chartmode"), toggle_reversevideo),
+    (toggle_opt("serialto_console"), cycle_chart_rollup),
+)
+
+
+async def main():
+    tasks = []
+    events = []
+
+    def add_output(chan, period_ms):
+        event = asyncio.Event()
+        events.append(event)
+        tasks.append(asyncio.create_task(output_task(chan, event, period_ms)))
+
+    if ENABLE_SERIAL:
+        add_output(serial, SERIAL_PERIOD_MILLISECS)
+        tasks.append(asyncio.create_task(host_task()))
+    if ENABLE_NEOPIXEL:
+        add_output(neopixel, NEOPIXEL_PERIOD_MILLISECS)
+    if ENABLE_LOG and samplelog.exists:
+        add_output(samplelog, 0)
+    if ENABLE_OLED:
+        add_output(oled, 0)     # write() only notes the reading
+        tasks.append(asyncio.create_task(display_task(oled)))
+
+    tasks.append(asyncio.create_task(sample_task(events)))
+    tasks.append(asyncio.create_task(sensor_poll_task()))
+    tasks.append(asyncio.create_task(button_task()))
+
+    await asyncio.gather(*tasks)
+
+
+# The reading the outputs are to show.
+latest = None
 
-    reading = Reading(us, t, h, status)
-    buffer.overwrite(reading)
-
-    for chan in outputs:
-        chan.write(reading)
-
-    # Update the time we should next make a measurement, and wait
-    # for that time. This avoids overall timing drift due to overheads
-    # in calculations, but not if the clock itself is fast or slow.
-    # The length of sleep partly determines the accuracy of our next
-    # measurement time, otherwise we could 'sleep' in longer chunks.
-    now = now + step
-    c1a = 0
-    c1b = 0
-    while monotonic_ns() < now:
-        if button_a.value:
-            c1a += 1
-        if button_b.value:
-            c1b += 1
-        sleep(NAP_TIME_SECS)
-
-    # c1 is time pressed in nap-times, but is also approximate!
-    if (c1a * NAP_TIME_MICROSECS) > (BUTTON_PRESS_MILLISECS * MICROSECS_TO_MILLISECS):
-        print("pressed")
-        opts["chartmode"] = not opts["chartmode"]
-
-    # c1 is time pressed in nap-times, but is also approximate!
-    if (c1b * NAP_TIME_MICROSECS) > (BUTTON_PRESS_MILLISECS * MICROSECS_TO_MILLISECS):
-        print("pressed")
-        opts["serialto_console"] = not opts["serialto_console"]
+start = monotonic_ns()
+asyncio.run(main())
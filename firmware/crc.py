@@ -0,0 +1,87 @@
+"""
+`crc`
+====================================================
+
+Table-driven CRCs shared by the sensor drivers and the serial telemetry.
+
+Each table is built once at import, so a CRC costs one table lookup per
+byte instead of eight shift-and-test steps in interpreted code.
+
+* CRC-8, poly 0x31, init 0xFF: Sensirion SHT3x/SHT4x
+* CRC-16/MODBUS, reflected poly 0xA001, init 0xFFFF: AM2320
+* CRC-16/CCITT-FALSE, poly 0x1021, init 0xFFFF: telemetry frames
+"""
+
+from array import array
+
+
+def _crc8_table(poly: int) -> bytes:
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            if crc & 0x80:
+                crc = ((crc << 1) ^ poly) & 0xFF
+            else:
+                crc = (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+
+def _crc16_table(poly: int, reflected: bool) -> array:
+    table = array("H", bytes(512))
+    for i in range(256):
+        if reflected:
+            crc = i
+            for _ in range(8):
+                if crc & 0x0001:
+                    crc = (crc >> 1) ^ poly
+                else:
+                    crc >>= 1
+        else:
+            crc = i << 8
+            for _ in range(8):
+                if crc & 0x8000:
+                    crc = ((crc << 1) ^ poly) & 0xFFFF
+                else:
+                    crc = (crc << 1) & 0xFFFF
+        table[i] = crc
+    return table
+
+
+CRC8_TABLE = _crc8_table(0x31)
+CRC16_MODBUS_TABLE = _crc16_table(0xA001, True)
+CRC16_CCITT_TABLE = _crc16_table(0x1021, False)
+
+
+def crc8(data, crc: int = 0xFF) -> int:
+    """Sensirion CRC-8 of 'data'. [0xBE, 0xEF] gives 0x92."""
+    table = CRC8_TABLE
+    for byte in data:
+        crc = table[crc ^ byte]
+    return crc
+
+
+def crc8_word(data, offset: int = 0) -> int:
+    """
+    Sensirion CRC-8 of the two bytes at data[offset]. Needs no slice, so
+    allocates nothing.
+    """
+    table = CRC8_TABLE
+    return table[table[0xFF ^ data[offset]] ^ data[offset + 1]]
+
+
+def crc16_modbus(data, crc: int = 0xFFFF) -> int:
+    """CRC-16/MODBUS of 'data', as used by the AM2320."""
+    table = CRC16_MODBUS_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_ccitt(data, crc: int = 0xFFFF) -> int:
+    """CRC-16/CCITT-FALSE of 'data'. b"123456789" gives 0x29B1."""
+    table = CRC16_CCITT_TABLE
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFF) ^ table[(crc >> 8) ^ byte]
+    return crc
@@ -0,0 +1,82 @@
+# The host's time is only trusted to move the estimate this far at once;
+# a bigger difference means the host clock was stepped, so start again.
+EPOCH_RESYNC_MILLISECS = 30_000
+
+# A sync that puts the host behind the estimate moves it back at most
+# this far: it is more likely late than the device fast, and the rate
+# correction takes care of the device being fast.
+EPOCH_PULL_MILLISECS = 20
+
+# A sync this far ahead of the estimate shows the syncs before it were
+# late, rather than the device slow, so the rate is measured afresh.
+EPOCH_JUMP_MILLISECS = 1_000
+
+# The rate is only estimated once syncs span this long, so that one late
+# sync can't skew it much.
+EPOCH_MIN_BASELINE_MILLISECS = 600_000
+
+# Any real crystal is well within this of nominal.
+EPOCH_MAX_PPM = 1_000
+
+
+class EpochClock:
+    """
+    Unix time, from the host's set-epoch commands, as an offset and rate
+    correction to the device's millisecond clock.
+
+    Everything is integer milliseconds: CircuitPython's floats can't hold
+    a Unix time to better than minutes.
+
+    A sync reaches the device late by however long the command waited
+    to be read, never early. So a sync that puts the host ahead of the
+    estimate is taken at once, while one behind it only pulls the
+    estimate back a little, to follow real drift without following
+    every delay. The rate is from the first sync (or the last big jump
+    forward) to the latest estimate.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.first_dev = None
+        self.first_host = None
+        self.dev = None
+        self.host = None
+        self.ppm = 0
+
+    @property
+    def synced(self) -> bool:
+        return self.dev is not None
+
+    def sync(self, host_ms: int, dev_ms: int):
+        """The host's Unix time was 'host_ms' at device time 'dev_ms'."""
+        if self.synced:
+            residual = host_ms - self.epoch_ms(dev_ms)
+            if abs(residual) > EPOCH_RESYNC_MILLISECS:
+                print(f"Host time moved {residual} ms; resyncing")
+                self.reset()
+
+        if not self.synced:
+            self.first_dev = self.dev = dev_ms
+            self.first_host = self.host = host_ms
+            return
+
+        if residual < 0:
+            residual = max(residual // 8, -EPOCH_PULL_MILLISECS)
+        self.host = self.epoch_ms(dev_ms) + residual
+        self.dev = dev_ms
+        if residual > EPOCH_JUMP_MILLISECS:
+            self.first_dev, self.first_host = self.dev, self.host
+
+        baseline = self.dev - self.first_dev
+        if baseline >= EPOCH_MIN_BASELINE_MILLISECS:
+            ppm = ((self.host - self.first_host) - baseline) * 1_000_000 // baseline
+            self.ppm = max(-EPOCH_MAX_PPM, min(ppm, EPOCH_MAX_PPM))
+
+    def epoch_ms(self, dev_ms: int) -> int:
+        """The Unix time in milliseconds at device time 'dev_ms', or None if not synced."""
+        if not self.synced:
+            return None
+        elapsed = dev_ms - self.dev
+        return self.host + elapsed + elapsed * self.ppm // 1_000_000
@@ -1,8 +1,11 @@
+from math import ceil, floor
 from time import sleep
 import adafruit_ssd1306
+from chartcolumns import ChartColumns
 from circularbuffer import CircularBuffer
 from output import BaseOutput
 from reading import Reading
+from rollup import Rollup
 
 try:
     from typing import List, Tuple, Union
@@ -18,6 +21,12 @@ class SSD1306(BaseOutput):
     OLED_W = 128
     OLED_H = 32
 
+    # The chart's Y limits are widened by at least CHART_Y_SLACK and
+    # rounded out to a multiple of CHART_Y_STEP, so the scale only
+    # changes (forcing a full redraw) when the data moves noticeably.
+    CHART_Y_SLACK = 0.25
+    CHART_Y_STEP = 0.5
+
     opts = {}
     oled = None
     bus = None
@@ -37,14 +46,37 @@ class SSD1306(BaseOutput):
     gw = 0
     gh = 0
 
-    def __init__(self, bus, buffer, opts: dict):
+    # Incremental chart state: what the last full redraw was drawn with
+    # (None forces a full redraw), its min_s, how far it has scrolled
+    # since in pixels, and the last point plotted.
+    chart_key = None
+    chart_origin_s = 0
+    chart_offset = 0
+    chart_last = None
+    chart_span = 0
+    tick_y = ()
+
+    # Column chart state: the oldest and newest column numbers drawn.
+    columns_drawn = (0, 0)
+
+    # The column chart has a pixel column for each column of history,
+    # between the Y axis and the right edge.
+    CHART_COLUMNS = OLED_W - 15
+
+    def __init__(self, bus, buffer, opts: dict, columns: ChartColumns = None, rollups: tuple = ()):
         super().__init__(opts)
         self.oled = None
         self.bus = bus
         self.opts = opts
         self.buffer = buffer
+        self.columns = columns
+        self.rollups = rollups
         self.is_reverse = False
 
+        # The reading to show, and what the screen was last drawn with.
+        self.latest = None
+        self.shown = None
+
         for c in range(1, 2):
             try:
                 self.oled = adafruit_ssd1306.SSD1306_I2C(width=self.OLED_W, height=self.OLED_H,
@@ -100,18 +132,12 @@ class SSD1306(BaseOutput):
 
 
     def get_bounds(self, buffer: CircularBuffer):
-        # Calculate the Bounds of the data
-        min_s, max_s = 100_000_000, 0
-        min_t, max_t = 100, 0
-        for v in buffer:
-            min_t = min(min_t, v.temp)
-            min_s = min(min_s, v.secs)
-            max_t = max(max_t, v.temp)
-            max_s = max(max_s, v.secs)
-        self.min_s = min_s
-        self.min_t = min_t
-        self.max_s = max_s
-        self.max_t = max_t
+        # Calculate the Bounds of the data. The buffer keeps the min & max
+        # temperature as it goes.
+        self.min_s = buffer.oldest().secs
+        self.max_s = buffer.latest().secs
+        self.min_t = buffer.lowest()
+        self.max_t = buffer.highest()
 
 
     def drawchart(self, buffer: CircularBuffer, color: int, point: tuple, size: tuple):
@@ -124,33 +150,20 @@ class SSD1306(BaseOutput):
             self.gw, self.gh = w - 14, h - 1
 
             self.get_bounds(buffer)
-
-            # Allow 'slack' around Y limits (& also prevent div0 error!)
-            self.min_t -= 0.25
-            self.max_t += 0.25
-
-            # Calculate range & scale:
-            self.t_range = self.max_t - self.min_t
-            self.t_scale = self.gh / self.t_range
+            self.set_tscale(self.min_t, self.max_t)
             self.s_range = max(self.max_s - self.min_s, 32)
-            self.s_scale = self.gw / self.s_range
-
-            # Integer Y's near the min & max Y axis.
-            min_y = int(round(self.min_t, 0))
-            _, py1 = self.rescale(self.min_s, min_y)
-            max_y = int(round(self.max_t, 0))
-            _, py2 = self.rescale(self.min_s, max_y)
+            # The newest reading goes in the last pixel column, gw - 1 from the axis.
+            self.s_scale = (self.gw - 1) / self.s_range
 
-            # vline for Y axis:
-            self.oled.line(self.gx, self.gy, self.gx, self.gy + self.gh, color)
+            # While the scales and layout stay the same, the chart so far
+            # can be scrolled along rather than redrawn.
+            key = (point, size, color, self.min_t, self.max_t, self.s_range)
+            if key == self.chart_key and self.opts["oled_incremental"]:
+                if self.scrollchart(buffer, color):
+                    return
+            self.chart_key = key
 
-            # tick for Y axis:
-            self.oled.line(self.gx - 2, py1, self.gx + 2, py1, color)
-            self.oled.line(self.gx - 2, py2, self.gx + 2, py2, color)
-
-            self.oled.text(f"{max_y}", sx, sy, color=color)
-            self.oled.text(f"{min_y}", sx, sy + h - 7, color=color)
-            self.oled.text(f"T{self.timestr(self.s_range)}", sx + 84, sy + 25, color=color)
+            self.drawaxes(point, size, color, self.s_range)
 
             # Now plot the graph
             lastpx, lastpy = None, None
@@ -163,14 +176,259 @@ class SSD1306(BaseOutput):
                     self.oled.line(lastpx, lastpy, px, py, color)
                 lastpx, lastpy = px, py
 
+            self.chart_origin_s = self.min_s
+            self.chart_offset = 0
+            self.chart_last = (v.secs, lastpx, lastpy)
+
+
+    def drawcolumns(self, columns: ChartColumns, color: int, point: tuple, size: tuple):
+        """
+        Chart 'columns' a pixel column each, oldest by the Y axis: a bar
+        from the lowest to the highest reading in the column, joined to
+        the last reading in the column before. However long the history,
+        this is one bar and one line per column.
+        """
+        if self.exists and len(columns) > 0:
+            (w, h) = size
+            (sx, sy) = point
+
+            # Allow for the Y axis.
+            self.gx, self.gy = sx + 14, sy
+            self.gw, self.gh = w - 14, h - 1
+
+            self.set_tscale(columns.lowest(), columns.highest())
+            span = len(columns) * columns.secs
+
+            # Columns are only ever added at the right, or dropped at the
+            # left, unless they are merged (a new generation).
+            key = ("columns", point, size, color, self.min_t, self.max_t, columns.generation)
+            if key == self.chart_key and self.opts["oled_incremental"]:
+                oldest, newest = self.columns_drawn
+                shift = columns.oldest - oldest
+                if shift < self.gw - 1:
+                    if shift > 0:
+                        self.scrollregion(shift)
+                        self.drawticks(color)
+                    if span != self.chart_span:
+                        self.oled.fill_rect(sx + 84, sy + 25, w - 84, 8, self.OLED_BG)
+                        self.drawspan(point, color, span)
+                    # The newest column drawn may have had more readings since.
+                    for n in range(max(newest, columns.oldest), columns.newest + 1):
+                        self.drawcolumn(columns, n, color)
+                    self.columns_drawn = (columns.oldest, columns.newest)
+                    return
+            self.chart_key = key
+
+            self.drawaxes(point, size, color, span)
+            for n in range(columns.oldest, columns.newest + 1):
+                self.drawcolumn(columns, n, color)
+            self.columns_drawn = (columns.oldest, columns.newest)
+
+
+    def drawrollup(self, rollup: Rollup, color: int, point: tuple, size: tuple):
+        """
+        Chart the newest periods of 'rollup' a pixel column each, newest
+        at the right: a bar from the period's min to max temperature,
+        with a gap at its mean if there's room. Missing periods are left
+        blank, so the X axis is always one period a pixel.
+        """
+        if self.exists and len(rollup) > 0:
+            (w, h) = size
+            (sx, sy) = point
+
+            # Allow for the Y axis.
+            self.gx, self.gy = sx + 14, sy
+            self.gw, self.gh = w - 14, h - 1
+
+            newest = rollup.number(-1)
+            oldest = newest - self.CHART_COLUMNS + 1
+            self.set_tscale(*rollup.temp_bounds(oldest))
+            span = min(newest - rollup.number(0) + 1, self.CHART_COLUMNS) * rollup.secs
+
+            # Periods are only added at the right, and only the newest
+            # changes, so the chart scrolls like the column chart.
+            key = ("rollup", rollup.secs, point, size, color, self.min_t, self.max_t)
+            if key == self.chart_key and self.opts["oled_incremental"]:
+                drawn_oldest, drawn_newest = self.columns_drawn
+                shift = oldest - drawn_oldest
+                if 0 <= shift < self.gw - 1:
+                    if shift > 0:
+                        self.scrollregion(shift)
+                    if span != self.chart_span:
+                        self.oled.fill_rect(sx + 84, sy + 25, w - 84, 8, self.OLED_BG)
+                        self.drawspan(point, color, span)
+                    self.drawperiods(rollup, max(drawn_newest, oldest), oldest, color)
+                    self.drawticks(color)
+                    self.columns_drawn = (oldest, newest)
+                    return
+            self.chart_key = key
+
+            self.drawaxes(point, size, color, span)
+            self.drawperiods(rollup, oldest, oldest, color)
+            self.drawticks(color)
+            self.columns_drawn = (oldest, newest)
+
+
+    def drawperiods(self, rollup: Rollup, since: int, oldest: int, color: int):
+        """
+        (Re)draw the pixel columns for periods numbered 'since' on, with
+        period 'oldest' by the Y axis. The Y ticks must be redrawn after.
+        """
+        n = len(rollup)
+        while n > 0 and rollup.number(n - 1) >= since:
+            n -= 1
+        for n in range(n, len(rollup)):
+            number = rollup.number(n)
+            px = self.gx + 1 + number - oldest
+            self.oled.vline(px, self.gy, self.gh + 1, self.OLED_BG)
+            low, mean, high = rollup.temp(n)
+            top = self.yscale(high)
+            bottom = self.yscale(low)
+            self.oled.vline(px, top, bottom - top + 1, color)
+            if bottom - top >= 2:
+                self.oled.pixel(px, self.yscale(mean), self.OLED_BG)
+
+
+    def drawcolumn(self, columns: ChartColumns, n: int, color: int):
+        i = columns.index(n)
+        if columns.count[i] == 0:
+            return
+        px = self.gx + 1 + n - columns.oldest
+        top = self.yscale(columns.high[i])
+        bottom = self.yscale(columns.low[i])
+        self.oled.vline(px, top, bottom - top + 1, color)
+        if n > columns.oldest:
+            j = columns.index(n - 1)
+            if columns.count[j] > 0:
+                self.oled.line(px - 1, self.yscale(columns.last[j]),
+                               px, self.yscale(columns.first[i]), color)
+
+
+    def set_tscale(self, min_t: float, max_t: float):
+        # Allow 'slack' around Y limits (& also prevent div0 error!)
+        step = self.CHART_Y_STEP
+        self.min_t = floor((min_t - self.CHART_Y_SLACK) / step) * step
+        self.max_t = ceil((max_t + self.CHART_Y_SLACK) / step) * step
+
+        # Calculate range & scale:
+        self.t_range = self.max_t - self.min_t
+        self.t_scale = self.gh / self.t_range
+
+
+    def drawaxes(self, point: tuple, size: tuple, color: int, span: int):
+        """Clear the chart, and draw its axis, Y labels and time span."""
+        (w, h) = size
+        (sx, sy) = point
+        self.oled.fill_rect(sx, sy, w, self.OLED_H - sy, self.OLED_BG)
+
+        # Integer Y's near the min & max Y axis.
+        min_y = int(round(self.min_t, 0))
+        max_y = int(round(self.max_t, 0))
+        self.tick_y = (self.yscale(min_y), self.yscale(max_y))
+
+        # vline for Y axis:
+        self.oled.line(self.gx, self.gy, self.gx, self.gy + self.gh, color)
+        self.drawticks(color)
+
+        self.oled.text(f"{max_y}", sx, sy, color=color)
+        self.oled.text(f"{min_y}", sx, sy + h - 7, color=color)
+        self.drawspan(point, color, span)
+
+
+    def drawspan(self, point: tuple, color: int, span: int):
+        (sx, sy) = point
+        self.oled.text(f"T{self.timestr(span)}", sx + 84, sy + 25, color=color)
+        self.chart_span = span
+
+
+    def drawticks(self, color: int):
+        for py in self.tick_y:
+            self.oled.line(self.gx - 2, py, self.gx + 2, py, color)
+
+
+    def scrollchart(self, buffer: CircularBuffer, color: int) -> bool:
+        """
+        Bring the chart up to date by scrolling it left as the oldest
+        readings drop out and drawing only the segments to the new ones.
+        Return False if it needs a full redraw instead.
+        """
+        last_s, lastpx, lastpy = self.chart_last
+        if buffer.latest().secs <= last_s:
+            return True
+
+        # Pixel x's stay relative to the full redraw's min_s, so points
+        # don't shift about by rounding as the chart scrolls.
+        offset = int(round((self.min_s - self.chart_origin_s) * self.s_scale))
+        shift = offset - self.chart_offset
+        lastpx -= shift
+        if shift < 0 or lastpx <= self.gx:
+            return False
+
+        if shift > 0:
+            self.scrollregion(shift)
+            self.chart_offset = offset
+            # The ticks reach into the chart, so were scrolled away.
+            self.drawticks(color)
+
+        # Only the newest few readings are new; find them from the end
+        # rather than rebuilding every reading in the buffer.
+        n = len(buffer) - 1
+        while n > 0 and buffer[n - 1].secs > last_s:
+            n -= 1
+        for n in range(n, len(buffer)):
+            v = buffer[n]
+            if v.secs > last_s:
+                px = self.gx + int(round((v.secs - self.chart_origin_s) * self.s_scale)) - offset
+                _, py = self.rescale(v.secs, v.temp)
+                self.oled.line(lastpx, lastpy, px, py, color)
+                lastpx, lastpy = px, py
+
+        self.chart_last = (v.secs, lastpx, lastpy)
+        return True
+
+
+    def scrollregion(self, shift: int):
+        """
+        Move the chart area right of the Y axis 'shift' pixels left,
+        clearing the columns uncovered on the right. Works on the
+        SSD1306's MVLSB buffer directly: each byte is 8 pixels of one
+        column, and a page of 8 rows is a run of 'stride' bytes.
+        """
+        buf = self.oled.buf
+        stride = self.oled.stride
+        x0 = self.gx + 1
+        x1 = min(self.gx + self.gw + 1, self.oled.width)
+        y0 = self.gy
+        y1 = self.gy + self.gh + 1
+        shift = min(shift, x1 - x0)
+
+        for page in range(y0 >> 3, ((y1 - 1) >> 3) + 1):
+            top = max(y0 - page * 8, 0)
+            bottom = min(y1 - page * 8, 8)
+            mask = ((1 << bottom) - 1) & ~((1 << top) - 1)
+            start = page * stride + x0
+            end = page * stride + x1
+            if mask == 0xFF:
+                buf[start:end - shift] = bytes(buf[start + shift:end])
+                buf[end - shift:end] = bytes(shift)
+            else:
+                # Leave the rows in this page outside the chart alone.
+                keep = ~mask & 0xFF
+                for i in range(start, end - shift):
+                    buf[i] = (buf[i] & keep) | (buf[i + shift] & mask)
+                for i in range(end - shift, end):
+                    buf[i] &= keep
+
 
     def rescale(self, vx, vy):
         px = ((vx - self.min_s) * self.s_scale)
         px = self.gx + int(round(px))
+        return px, self.yscale(vy)
+
 
+    def yscale(self, vy) -> int:
         py = ((vy - self.min_t) * self.t_scale)
-        py = self.gy + self.gh - int(round(py))
-        return px, py
+        return self.gy + self.gh - int(round(py))
 
 
     def drawtext(self, text, color=1, point=(0, 0), scale=1):
@@ -178,13 +436,21 @@ class SSD1306(BaseOutput):
 
 
     def drawscreen(self, buffer, t: float, h: float, status, sec: int, opts: dict):
-        self.oled.fill(self.OLED_BG)
-
         if opts["chartmode"]:
-            self.drawchart(buffer=buffer, color=self.OLED_FG, point=(0, 0), size=(128, 18))
+            # The chart clears the screen itself when it redraws in full.
+            rollup = opts["chart_rollup"]
+            if rollup is not None and rollup < len(self.rollups):
+                self.drawrollup(self.rollups[rollup], color=self.OLED_FG, point=(0, 0), size=(128, 18))
+            elif opts["chart_columns"] and self.columns is not None:
+                self.drawcolumns(self.columns, color=self.OLED_FG, point=(0, 0), size=(128, 18))
+            else:
+                self.drawchart(buffer=buffer, color=self.OLED_FG, point=(0, 0), size=(128, 18))
+            self.oled.fill_rect(0, 25, 84, 8, self.OLED_BG)
             self.drawtext(f"{t:4.1f}C", color=self.OLED_FG, point=(0, 25))
             self.drawtext(f"{h:4.1f}%", color=self.OLED_FG, point=(42, 25))
         else:
+            self.oled.fill(self.OLED_BG)
+            self.chart_key = None
             self.drawtext(f"{t:4.1f}", color=self.OLED_FG, point=(0, 2), scale=2)
             self.drawtext(f"C", color=self.OLED_FG, point=(54, 10))
             self.drawtext(f"{h:4.1f}", color=self.OLED_FG, point=(70, 2), scale=2)
@@ -207,6 +473,26 @@ class SSD1306(BaseOutput):
 
 
     def write(self, value: Reading):
-        if self.exists:
-            self.drawscreen(self.buffer, value.temp, value.humidity, value.status, value.secs, self.opts)
+        """
+        Note the reading to show. The screen is drawn by refresh(), so
+        readings may come faster than the display can keep up with.
+        """
+        self.latest = value
+
+
+    def refresh(self) -> bool:
+        """
+        Redraw the screen if what it would show has changed: a new
+        reading, or a change of display mode. Return True if it did.
+        """
+        value = self.latest
+        if not self.exists or value is None:
+            return False
+        shown = (value, self.opts["chartmode"], self.opts["chart_columns"],
+                 self.opts["chart_rollup"], self.opts["usbdrive_visible"])
+        if shown == self.shown:
+            return False
+        self.drawscreen(self.buffer, value.temp, value.humidity, value.status, value.secs, self.opts)
+        self.shown = shown
+        return True
 
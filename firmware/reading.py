@@ -1,16 +1,36 @@
 
 
 class Reading:
-    def __init__(self, se=0, tm=0, hu=0, st=0):
+    def __init__(self, se=0, tm=0, hu=0, st=0, sq=0, ss=None, ep=None):
         self._time = se
         self._temp = tm
         self._hum = hu
         self._stat = st
+        self._seq = sq
+        self._stats = ss
+        self._epoch = ep
 
     @property
     def secs(self) -> int:
         return int(self._time/1_000_000)
 
+    @property
+    def millisecs(self) -> int:
+        return int(self._time // 1_000)
+
+    @property
+    def epoch_ms(self) -> int:
+        """Unix time in milliseconds, if the host has told the device it."""
+        return self._epoch
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def stats(self) -> tuple:
+        return self._stats
+
     @property
     def status(self) -> int:
         return self._stat
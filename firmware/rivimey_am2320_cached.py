@@ -36,6 +36,7 @@ import time
 
 from adafruit_bus_device.i2c_device import I2CDevice
 from micropython import const
+from crc import crc16_modbus as _crc16
 
 try:
     # Used only for typing
@@ -84,22 +85,14 @@ AM2320_REG_STATUS = const(0xF)    # One byte, all bits 'reserved'
 #   0x83: CRC checksum error
 #   0x84: Write disabled
 
+# Phases of a split-phase read (see start_read).
+_PHASE_IDLE = const(0)
+_PHASE_WAKING = const(1)
+_PHASE_READING = const(2)
+
 def time_monotonic_ms():
     return int(time.monotonic_ns() / 1_000_000)
 
-def _crc16(data: bytearray) -> int:
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc >>= 1
-                crc ^= 0xA001
-            else:
-                crc >>= 1
-    return crc
-
-
 class AM2320Cached:
     """A driver for the AM2320 temperature and humidity sensor.
 
@@ -163,6 +156,8 @@ class AM2320Cached:
         self._regbuffer = None
         self._lastread_time = self._lastwrite_time = time_monotonic_ms()
         self._expires = AM2320_CACHE_EXP_T # millisecs
+        self._phase = _PHASE_IDLE
+        self._phase_time = 0
 
         for _ in range(3):
             # retry since we have to wake up the devices
@@ -180,7 +175,7 @@ class AM2320Cached:
         True if the last read was more than `expiry` ms ago.
         If so, a read_register call will read the device.
         """
-        return (time_monotonic_ms() - self.lastread_time) > self._expires
+        return (time_monotonic_ms() - self._lastread_time) > self._expires
 
     @property
     def expiry(self):
@@ -272,19 +267,80 @@ class AM2320Cached:
             i2c.readinto(result)
 
             self._lastwrite_time = time_monotonic_ms()
+            return self._check_reply(result, length)
+
+    def _check_reply(self, result: bytearray, length: int) -> bytearray:
+        """
+        Check the preamble and CRC of a register read reply, returning
+        the register bytes.
+        """
+        # print("> r%d => %s" % (register, [hex(i) for i in result]))
+        # Check preamble indicates correct readings
+        if result[0] != 0x3 or result[1] != length:
+            #print("I2C read failure")
+            raise RuntimeError("am2320 readreg failure")
+        # Check CRC on all but last 2 bytes
+        crc1 = struct.unpack("<H", bytes(result[-2:]))[0]
+        crc2 = _crc16(result[0:-2])
+        if crc1 != crc2:
+            raise RuntimeError("am2320 CRC 0x%04X != 0x%04X" % (crc1, crc2))
+        # Return bytes from 2 from start up to 2 from end.
+        return result[2:-2]
+
+    def start_read(self) -> None:
+        """
+        Start reading temperature and humidity without waiting for the
+        device. Call :meth:`read_ready` until it returns True, then
+        :meth:`finish_read`; the values are then available from
+        :attr:`temperature` and :attr:`relative_humidity` as usual.
+        None of these calls sleep.
+        """
+        with self._i2c as i2c:
+            try:
+                # The device NACKs the byte that wakes it up.
+                i2c.write(bytes([0x00]))
+            except OSError:
+                pass
+        self._phase = _PHASE_WAKING
+        self._phase_time = time_monotonic_ms()
 
-            # print("> r%d => %s" % (register, [hex(i) for i in result]))
-            # Check preamble indicates correct readings
-            if result[0] != 0x3 or result[1] != length:
-                #print("I2C read failure")
-                raise RuntimeError("am2320 readreg failure")
-            # Check CRC on all but last 2 bytes
-            crc1 = struct.unpack("<H", bytes(result[-2:]))[0]
-            crc2 = _crc16(result[0:-2])
-            if crc1 != crc2:
-                raise RuntimeError("am2320 CRC 0x%04X != 0x%04X" % (crc1, crc2))
-            # Return bytes from 2 from start up to 2 from end.
-            return result[2:-2]
+    def read_ready(self) -> bool:
+        """
+        Move a read started by :meth:`start_read` on as far as it can go now,
+        returning True once the reply can be collected.
+        """
+        now = time_monotonic_ms()
+        if self._phase == _PHASE_WAKING:
+            if (now - self._phase_time) < AM2320_DEVWAKE_T * 1000:
+                return False
+            cmd = bytes([AM2320_CMD_READREG, AM2320_REG_HUM_H, 4])
+            try:
+                with self._i2c as i2c:
+                    i2c.write(cmd)
+            except OSError:
+                # Still asleep: try waking it again.
+                self.start_read()
+                return False
+            self._phase = _PHASE_READING
+            self._phase_time = now
+            return False
+        if self._phase == _PHASE_READING:
+            return (now - self._phase_time) >= AM2320_DEVREAD_T * 1000
+        return self._phase == _PHASE_IDLE
+
+    def finish_read(self) -> None:
+        """
+        Collect the reply to a read started by :meth:`start_read`.
+        """
+        if self._phase != _PHASE_READING:
+            raise RuntimeError("am2320 read not started")
+        self._phase = _PHASE_IDLE
+        result = bytearray(4 + 4)  # 2 bytes pre, 2 bytes crc
+        with self._i2c as i2c:
+            i2c.readinto(result)
+        self._regbuffer = self._check_reply(result, 4)
+        self._lastread_time = time_monotonic_ms()
+        self._lastwrite_time = self._lastread_time - AM2320_DEVHIBER_T
 
     @property
     def temperature(self) -> float:
@@ -0,0 +1,108 @@
+from array import array
+
+# Values are kept as fixed point, in hundredths.
+FIXED_POINT = 100
+
+
+class Rollup:
+    """
+    The min, mean and max temperature and humidity over each of the last
+    'length' periods of 'secs' seconds, kept in arrays (22 bytes a period).
+
+    Periods are numbered secs // 'secs' of the readings in them, so they
+    stay on the same boundaries (whole minutes, hours) and a gap in the
+    readings leaves no periods rather than stretching the ones around it.
+    Adding a reading is O(1).
+    """
+
+    def __init__(self, length: int, secs: int):
+        self.length = length
+        self.secs = secs
+        self.numbers = array("L", [0] * length)
+        self.count = array("H", [0] * length)
+        self.t_low = array("h", [0] * length)
+        self.t_high = array("h", [0] * length)
+        self.t_sum = array("l", [0] * length)
+        self.h_low = array("h", [0] * length)
+        self.h_high = array("h", [0] * length)
+        self.h_sum = array("l", [0] * length)
+        self.clear()
+
+    def clear(self):
+        self.start = 0        # ring index of the oldest period
+        self.periods = 0      # periods in use
+
+    def __len__(self):
+        return self.periods
+
+    def index(self, n: int) -> int:
+        """Where period 'n' is kept, counting from 0 for the oldest, or back from -1 for the newest."""
+        if n < 0:
+            n += self.periods
+        if n < 0 or n >= self.periods:
+            raise IndexError("Rollup index out of range")
+        return (self.start + n) % self.length
+
+    def add(self, secs: int, temp: float, humidity: float):
+        number = secs // self.secs
+        t = int(round(temp * FIXED_POINT))
+        h = int(round(humidity * FIXED_POINT))
+        if self.periods > 0:
+            i = self.index(-1)
+            newest = self.numbers[i]
+            if number < newest:
+                # Out of order; the period it belongs to has been rolled up.
+                return
+            if number == newest:
+                self.count[i] += 1
+                self.t_low[i] = min(self.t_low[i], t)
+                self.t_high[i] = max(self.t_high[i], t)
+                self.t_sum[i] += t
+                self.h_low[i] = min(self.h_low[i], h)
+                self.h_high[i] = max(self.h_high[i], h)
+                self.h_sum[i] += h
+                return
+
+        if self.periods == self.length:
+            self.start = (self.start + 1) % self.length
+        else:
+            self.periods += 1
+        i = self.index(-1)
+        self.numbers[i] = number
+        self.count[i] = 1
+        self.t_low[i] = self.t_high[i] = self.t_sum[i] = t
+        self.h_low[i] = self.h_high[i] = self.h_sum[i] = h
+
+    def number(self, n: int) -> int:
+        """The period number of period 'n'."""
+        return self.numbers[self.index(n)]
+
+    def temp(self, n: int) -> tuple:
+        """The (min, mean, max) temperature in period 'n'."""
+        i = self.index(n)
+        return (self.t_low[i] / FIXED_POINT,
+                self.t_sum[i] / self.count[i] / FIXED_POINT,
+                self.t_high[i] / FIXED_POINT)
+
+    def humidity(self, n: int) -> tuple:
+        """The (min, mean, max) humidity in period 'n'."""
+        i = self.index(n)
+        return (self.h_low[i] / FIXED_POINT,
+                self.h_sum[i] / self.count[i] / FIXED_POINT,
+                self.h_high[i] / FIXED_POINT)
+
+    def temp_bounds(self, since: int) -> tuple:
+        """The lowest and highest temperature in periods numbered 'since' on, or None."""
+        low, high = None, None
+        for n in range(self.periods - 1, -1, -1):
+            i = self.index(n)
+            if self.numbers[i] < since:
+                break
+            if low is None:
+                low, high = self.t_low[i], self.t_high[i]
+            else:
+                low = min(low, self.t_low[i])
+                high = max(high, self.t_high[i])
+        if low is None:
+            return None
+        return (low / FIXED_POINT, high / FIXED_POINT)
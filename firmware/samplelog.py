@@ -0,0 +1,119 @@
+import asyncio
+import os
+import storage
+from output import BaseOutput
+from reading import Reading
+from telemetry import FrameEncoder, FRAME_LEN
+
+# Flash is erased 4KB at a time, so the log is written a whole 4KB of
+# readings at once: 256 readings, 21 minutes at one every 5s.
+LOG_CHUNK_BYTES = 4096
+
+# Bytes read from the log at a time when sending it to the host.
+LOG_COPY_BYTES = 512
+
+
+class SampleLog(BaseOutput):
+    """
+    Log readings to a file on the device's own filesystem, as binary
+    frames (see telemetry.py), so they survive the host being away and
+    the device being reset.
+
+    Readings are packed into a preallocated chunk in memory and the file
+    is only written when the chunk is full, so the flash sees one 4KB
+    write per LOG_CHUNK_BYTES of readings rather than one per reading.
+    Readings not yet written are lost if the power goes. When the file
+    reaches 'max_bytes' it becomes 'path'.old, replacing the one before.
+
+    The filesystem is only writable by the firmware when boot.py has
+    hidden the USB drive from the host; otherwise the log does nothing.
+    Frame times are milliseconds since the boot they were taken in, so a
+    drop in time marks a reset.
+    """
+
+    def __init__(self, opts, path: str, max_bytes: int):
+        super().__init__(opts)
+        self.path = path
+        self.old_path = path + ".old"
+        self.max_bytes = max_bytes
+        self.chunk = bytearray(LOG_CHUNK_BYTES)
+        self.used = 0
+        self.copying = False
+        self.encoder = FrameEncoder()
+        self.writable = not storage.getmount("/").readonly
+        self.size = self.file_size(self.path)
+
+    @staticmethod
+    def file_size(path: str) -> int:
+        try:
+            return os.stat(path)[6]
+        except OSError:
+            return 0
+
+    @property
+    def exists(self) -> bool:
+        return self.writable
+
+    def __len__(self):
+        """The number of readings logged."""
+        return (self.file_size(self.old_path) + self.size + self.used) // FRAME_LEN
+
+    def write(self, value: Reading):
+        if not self.exists:
+            return
+        self.encoder.pack_into(self.chunk, self.used, value)
+        self.used += FRAME_LEN
+        if self.used + FRAME_LEN > len(self.chunk):
+            self.flush()
+
+    def flush(self):
+        """Write the readings packed so far to the file."""
+        if self.used == 0:
+            return
+        try:
+            # Not while copy_to() is reading the files: the file just
+            # runs over by a chunk, and rotates next time.
+            if self.size + self.used > self.max_bytes and not self.copying:
+                self.rotate()
+            with open(self.path, "ab") as f:
+                f.write(memoryview(self.chunk)[:self.used])
+            self.size += self.used
+        except OSError as ex:
+            print(f"Exception writing log: {ex}")
+        # Drop the chunk even if it couldn't be written, rather than
+        # trying again with every reading.
+        self.used = 0
+
+    def rotate(self):
+        try:
+            os.remove(self.old_path)
+        except OSError:
+            pass
+        os.rename(self.path, self.old_path)
+        self.size = 0
+
+    async def copy_to(self, port):
+        """
+        Write the whole log to 'port', oldest first, including the
+        readings not yet written to the file. Other tasks run between
+        reads, and readings logged meanwhile are copied too: the file is
+        read to its end, and the chunk written straight after.
+        """
+        buf = bytearray(LOG_COPY_BYTES)
+        view = memoryview(buf)
+        self.copying = True
+        try:
+            for path in (self.old_path, self.path):
+                try:
+                    with open(path, "rb") as f:
+                        while True:
+                            n = f.readinto(buf)
+                            if not n:
+                                break
+                            port.write(view[:n])
+                            await asyncio.sleep(0)
+                except OSError:
+                    pass
+            port.write(memoryview(self.chunk)[:self.used])
+        finally:
+            self.copying = False
@@ -8,6 +8,24 @@ class BaseSensor:
         self.bus = thebus
         self.opts = opts
 
+    # A reading is taken in three steps so that the caller can get on
+    # with other work while the sensor converts:
+    #
+    #   start_measurement(), then measurement_ready() until True, then
+    #   fetch(), after which celcius, relhumidity and status give the
+    #   reading.
+    #
+    # None of these may block for longer than an I2C transfer.
+
+    def start_measurement(self):
+        pass
+
+    def measurement_ready(self) -> bool:
+        return True
+
+    def fetch(self):
+        pass
+
     @property
     def relhumidity(self) -> float:
         return 0
@@ -24,6 +42,32 @@ class BaseSensor:
     def exists(self) -> bool:
         return False
 
+    @property
+    def stats(self) -> tuple:
+        """
+        For sensors that average several measurements into one reading:
+        (count, temp min, temp max, temp stddev, humidity min, humidity max,
+        humidity stddev) of those in the current reading, else None.
+        """
+        return None
+
+    @property
+    def repeatability(self) -> str:
+        """Measurement repeatability ("High", "Medium" or "Low"), or None if the sensor has none."""
+        return None
+
+    @repeatability.setter
+    def repeatability(self, rep: str):
+        raise ValueError("sensor has no repeatability setting")
+
+    def poll(self):
+        """Called frequently between readings; must not block."""
+        pass
+
+    def new_window(self):
+        """Start collecting measurements for the next reading."""
+        pass
+
     def show_i2cdevs(self):
         self.bus.try_lock()
         print("I2C addresses found:", [hex(device_address) for device_address in self.bus.scan()])
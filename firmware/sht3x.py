@@ -1,15 +1,75 @@
-from time import sleep
+from time import sleep, monotonic_ns
+from math import sqrt
 
 from sensor import BaseSensor
 # import adafruit_sht4x
 import adafruit_sht31d
 
+NANOSECS_TO_SECS = 1_000_000_000
+
+# How soon to try again if the sensor had nothing new.
+RETRY_NANOSECS = 20_000_000
+
+
+class RunningStats:
+    """
+    Mean, min, max and standard deviation of a stream of values, using
+    Welford's method as CircuitPython floats are too short for sums of
+    squares.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = 0.0
+        self.max = 0.0
+
+    def add(self, v: float):
+        self.n += 1
+        if self.n == 1:
+            self.min = self.max = v
+        else:
+            self.min = min(self.min, v)
+            self.max = max(self.max, v)
+        delta = v - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (v - self.mean)
+
+    @property
+    def stddev(self) -> float:
+        if self.n < 2:
+            return 0.0
+        return sqrt(self.m2 / (self.n - 1))
+
 
 class SHT3x(BaseSensor):
+    """
+    SHT3x sensor, in single-shot mode or, if opts["sht3x_frequency"] is
+    set (Hz, or "art"), in periodic mode.
+
+    In single-shot mode each reading is a measurement started by
+    start_measurement() and collected by fetch().
+
+    In periodic mode the sensor measures on its own; poll() collects each
+    new measurement without waiting, and a reading is the mean of those
+    collected since new_window(), with their min, max and standard
+    deviation in stats.
+    """
     sht30 = None
 
     def __init__(self, bus, opts):
         super().__init__(bus, opts)
+        self.frequency = opts.get("sht3x_frequency", None)
+        self.temp_stats = RunningStats()
+        self.hum_stats = RunningStats()
+        self.next_fetch = 0
+        self.period = 0
+        self.ready_at = 0
+
         sht30_addr = 0x45
         for _ in range(1, 4):
             try:
@@ -24,6 +84,77 @@ class SHT3x(BaseSensor):
                 sht30_addr = 0x44 if sht30_addr == 0x45 else 0x45
                 sleep(0.5)
 
+        if self.sht30 is not None and self.frequency is not None:
+            self.periodic(self.frequency)
+
+
+    def periodic(self, frequency):
+        """
+        Start the sensor measuring by itself at 'frequency' Hz (one of
+        adafruit_sht31d.FREQUENCY_*), or 4Hz with accelerated response
+        time if 'frequency' is "art".
+        """
+        if frequency == "art":
+            self.sht30.art = True
+            frequency = adafruit_sht31d.FREQUENCY_4
+        else:
+            self.sht30.art = False
+            self.sht30.frequency = frequency
+        self.sht30.mode = adafruit_sht31d.MODE_PERIODIC
+        self.period = int(NANOSECS_TO_SECS / frequency)
+        self.next_fetch = monotonic_ns() + self.period
+        self.new_window()
+
+
+    @property
+    def is_periodic(self) -> bool:
+        return self.sht30 is not None and self.sht30.mode == adafruit_sht31d.MODE_PERIODIC
+
+
+    def poll(self):
+        if not self.is_periodic:
+            return
+        now = monotonic_ns()
+        if now < self.next_fetch:
+            return
+        try:
+            if self.sht30.fetch():
+                self.temp_stats.add(self.sht30.cached_temperature)
+                self.hum_stats.add(self.sht30.cached_humidity)
+                self.next_fetch = now + self.period
+                return
+        except RuntimeError as ex:
+            print(f"Exception fetching from sensor: {ex}")
+        self.next_fetch = now + RETRY_NANOSECS
+
+
+    def start_measurement(self):
+        if not self.is_periodic:
+            self.sht30.start_measurement()
+            self.ready_at = monotonic_ns() + int(self.sht30.measurement_delay * NANOSECS_TO_SECS)
+
+
+    def measurement_ready(self) -> bool:
+        return self.is_periodic or monotonic_ns() >= self.ready_at
+
+
+    def fetch(self):
+        if not self.is_periodic:
+            self.sht30.read_measurement()
+
+
+    def new_window(self):
+        self.temp_stats.clear()
+        self.hum_stats.clear()
+
+
+    @property
+    def stats(self) -> tuple:
+        if not self.is_periodic or self.temp_stats.n == 0:
+            return None
+        t, h = self.temp_stats, self.hum_stats
+        return (t.n, t.min, t.max, t.stddev, h.min, h.max, h.stddev)
+
 
     @property
     def exists(self) -> bool:
@@ -35,11 +166,32 @@ class SHT3x(BaseSensor):
         return self.sht30.status
 
 
+    @property
+    def repeatability(self) -> str:
+        return self.sht30.repeatability if self.sht30 is not None else None
+
+
+    @repeatability.setter
+    def repeatability(self, rep: str):
+        # In periodic mode the driver restarts the sensor with it.
+        if self.sht30 is None:
+            raise ValueError("no sensor")
+        self.sht30.repeatability = rep
+
+
     @property
     def relhumidity(self) -> float:
-        return self.sht30.relative_humidity
+        if self.is_periodic:
+            if self.hum_stats.n == 0:
+                return self.sht30.cached_humidity
+            return self.hum_stats.mean
+        return self.sht30.cached_humidity
 
 
     @property
     def celcius(self) -> float:
-        return self.sht30.temperature
+        if self.is_periodic:
+            if self.temp_stats.n == 0:
+                return self.sht30.cached_temperature
+            return self.temp_stats.mean
+        return self.sht30.cached_temperature
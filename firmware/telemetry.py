@@ -0,0 +1,55 @@
+import struct
+from micropython import const
+from reading import Reading
+from crc import crc16_ccitt
+
+# Binary reading frame, all little-endian:
+#
+#   0   sync byte (0xA5, never present in the JSON text)
+#   1   payload length (12, or 20 with epoch)
+#   2   seq: uint16, reading count since boot, wrapping
+#   4   temp: int16, 0.01 C
+#   6   humidity: uint16, 0.01 %RH
+#   8   status: uint16
+#   10  time: uint32, milliseconds since boot, wrapping
+#   14  epoch: int64, Unix time in milliseconds (only once the host has
+#       sent set-epoch)
+#   14 or 22  CRC-16/CCITT-FALSE of bytes 1 up to it
+#
+# 16 bytes a reading (24 with epoch), against about 55 for the JSON line.
+
+FRAME_SYNC = const(0xA5)
+FRAME_PAYLOAD = const(12)
+FRAME_LEN = const(16)
+FRAME_FORMAT = "<BBHhHHI"
+FRAME_EPOCH_PAYLOAD = const(20)
+FRAME_EPOCH_LEN = const(24)
+
+
+class FrameEncoder:
+    """
+    Packs readings into binary frames, reusing one buffer.
+    """
+
+    def __init__(self):
+        self.frame = bytearray(FRAME_EPOCH_LEN)
+
+    def pack(self, value: Reading, epoch_ms: int = None) -> memoryview:
+        """The frame for 'value', with 'epoch_ms' if given."""
+        self.pack_into(self.frame, 0, value, epoch_ms)
+        return memoryview(self.frame)[:FRAME_LEN if epoch_ms is None else FRAME_EPOCH_LEN]
+
+    def pack_into(self, buffer, offset: int, value: Reading, epoch_ms: int = None):
+        """Pack 'value' as a frame into 'buffer' (a bytearray) at 'offset'."""
+        payload, length = FRAME_PAYLOAD, FRAME_LEN
+        if epoch_ms is not None:
+            payload, length = FRAME_EPOCH_PAYLOAD, FRAME_EPOCH_LEN
+            struct.pack_into("<q", buffer, offset + FRAME_LEN - 2, epoch_ms)
+        struct.pack_into(FRAME_FORMAT, buffer, offset,
+                         FRAME_SYNC, payload, value.seq,
+                         int(round(value.temp * 100)),
+                         int(round(value.humidity * 100)),
+                         value.status & 0xFFFF,
+                         value.millisecs & 0xFFFFFFFF)
+        crc = crc16_ccitt(memoryview(buffer)[offset + 1:offset + length - 2])
+        struct.pack_into("<H", buffer, offset + length - 2, crc)
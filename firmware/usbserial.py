@@ -1,13 +1,31 @@
 from reading import Reading
 from output import BaseOutput
+from telemetry import FrameEncoder
+from json import dumps
+import asyncio
 import usb_cdc
 
+CMD_MAX_LEN = 64  # bytes
+
+# Lines (or log reads) written between yields to the other tasks while
+# sending a dump, so a long one doesn't hold up the readings or display.
+DUMP_CHUNK_LINES = 16
+
 class USBSerial(BaseOutput):
 
     output = None
 
-    def __init__(self, opts):
+    def __init__(self, opts, clock=None):
         super().__init__(opts)
+        self.clock = clock
+        self.cmdbuf = bytearray()
+        # Binary frames are used only once the host asks for them.
+        self.binary = False
+        self.encoder = FrameEncoder()
+        # While a dump is being sent, the newest live reading waits for
+        # it to finish rather than landing in the middle of it.
+        self.dumping = False
+        self.held = None
         self.whereto(self.opts["serialto_console"])
 
     def whereto(self, toconsole: bool):
@@ -20,13 +38,175 @@ class USBSerial(BaseOutput):
 
 
     def write(self, value: Reading):
+        if self.dumping:
+            self.held = value
+            return
         self.whereto(self.opts["serialto_console"])
         if self.output is not None:
-            print(self.json(value), file=self.output, flush=True)
+            self.emit(value)
+            self.output.flush()
+
+    def epoch_ms(self, value: Reading) -> int:
+        """
+        When 'value' was taken, in Unix milliseconds, or None if not known.
+        Buffered readings don't keep it, so it is worked out again.
+        """
+        if value.epoch_ms is not None:
+            return value.epoch_ms
+        if self.clock is not None:
+            return self.clock.epoch_ms(value.millisecs)
+        return None
+
+    def emit(self, value: Reading):
+        # Never send binary to the console: it's for people, and the REPL.
+        if self.binary and self.output is usb_cdc.data:
+            self.output.write(self.encoder.pack(value, self.epoch_ms(value)))
+        else:
+            print(self.json(value), file=self.output)
+
+    def read_command(self) -> str:
+        """
+        Return the next complete command line sent by the host on the data
+        port, or None. Only reads what is already waiting, so never blocks.
+        """
+        port = usb_cdc.data
+        if port is None or not port.connected:
+            return None
+
+        n = port.in_waiting
+        if n > 0:
+            self.cmdbuf.extend(port.read(n))
+
+        i = self.cmdbuf.find(b"\n")
+        if i < 0:
+            # Don't let line noise grow the buffer without limit.
+            if len(self.cmdbuf) > CMD_MAX_LEN:
+                self.cmdbuf = bytearray()
+            return None
+
+        line = bytes(self.cmdbuf[:i])
+        self.cmdbuf = self.cmdbuf[i + 1:]
+        try:
+            return line.decode().strip()
+        except UnicodeError:
+            # Line noise: skip it, as an empty line.
+            return ""
+
+    def reply(self, command: str, fields: dict):
+        """
+        Answer host command 'command' on the data port, where commands
+        come from, as a JSON line: {"reply": command} and 'fields'. It has
+        no 'temp' or 'humidity', so isn't mistaken for a reading.
+        """
+        port = usb_cdc.data
+        if port is None or not port.connected:
+            return
+        fields["reply"] = command
+        print(dumps(fields), file=port)
+        port.flush()
+
+    def start_dump(self) -> bool:
+        """
+        Get ready to send a dump, returning False if there's nowhere to
+        send it.
+        """
+        self.whereto(self.opts["serialto_console"])
+        if self.output is None:
+            return False
+        self.dumping = True
+        return True
+
+    def end_dump(self):
+        """Finish a dump, and send the live reading held back by it."""
+        self.dumping = False
+        value, self.held = self.held, None
+        if value is not None:
+            self.write(value)
+
+    async def dump(self, buffer, secs_f: float):
+        """
+        Write every reading in 'buffer' to the host as one batch, bracketed
+        by markers. The opening marker carries the current device time so
+        the host can place the batch even before it has seen a live reading.
+        """
+        if not self.start_dump():
+            return
+        try:
+            # Readings may be taken while the dump yields, dropping the
+            # oldest, so the batch is fixed as the readings there now, by
+            # their numbers in the buffer rather than their place in it.
+            first, count = buffer.first, len(buffer)
+            print(f"{{\"batch\": {count}, \"time\": {secs_f} }}", file=self.output)
+            for k in range(count):
+                n = first + k - buffer.first
+                if n >= 0:      # else overwritten already
+                    self.emit(buffer[n])
+                if k % DUMP_CHUNK_LINES == DUMP_CHUNK_LINES - 1:
+                    await asyncio.sleep(0)
+            print("{\"batch\": 0 }", file=self.output, flush=True)
+        finally:
+            self.end_dump()
+
+    async def dump_rollup(self, rollup, secs_f: float):
+        """
+        Write every period in 'rollup' to the host, oldest first, as JSON
+        lines between markers like those of dump(). Each gives the device
+        time the period starts and the min, mean and max in it; they have
+        no 'temp' or 'humidity', so aren't mistaken for readings.
+        """
+        if not self.start_dump():
+            return
+        try:
+            print(f"{{\"rollups\": {len(rollup)}, \"period\": {rollup.secs}, \"time\": {secs_f} }}",
+                  file=self.output)
+            for n in range(len(rollup)):
+                tmin, tmean, tmax = rollup.temp(n)
+                hmin, hmean, hmax = rollup.humidity(n)
+                print(f"{{\"period\": {rollup.secs}, \"time\": {rollup.number(n) * rollup.secs}, "
+                      f"\"samples\": {rollup.count[rollup.index(n)]}, "
+                      f"\"temp_min\": {tmin:.2f}, \"temp_mean\": {tmean:.2f}, \"temp_max\": {tmax:.2f}, "
+                      f"\"humidity_min\": {hmin:.2f}, \"humidity_mean\": {hmean:.2f}, \"humidity_max\": {hmax:.2f} }}",
+                      file=self.output)
+                if n % DUMP_CHUNK_LINES == DUMP_CHUNK_LINES - 1:
+                    await asyncio.sleep(0)
+            print("{\"rollups\": 0 }", file=self.output, flush=True)
+        finally:
+            self.end_dump()
+
+    async def dump_log(self, log, secs_f: float):
+        """
+        Write the whole of sample log 'log' to the host as binary frames,
+        between markers like those of dump(). Only sent on the data port.
+        """
+        if not self.start_dump():
+            return
+        try:
+            if self.output is usb_cdc.data:
+                print(f"{{\"log\": {len(log)}, \"time\": {secs_f} }}", file=self.output)
+                await log.copy_to(self.output)
+                print("{\"log\": 0 }", file=self.output, flush=True)
+        finally:
+            self.end_dump()
 
     @property
     def exists(self) -> bool:
         return not (usb_cdc.console is None and usb_cdc.data is None)
 
+    @staticmethod
+    def millisecs_str(ms: int) -> str:
+        """Integer milliseconds as seconds, without going through a float."""
+        return f"{ms // 1000}.{ms % 1000:03}"
+
     def json(self, value: Reading):
-        return f"{{\"time\": {value.secs_f}, \"temp\": {value.temp}, \"humidity\": {value.humidity} }}"
+        # Times go out from integer milliseconds, so a reading sent live
+        # and again from the buffer has the very same time, and a Unix
+        # time isn't rounded by a float that can't hold it.
+        ep = self.epoch_ms(value)
+        epoch = "" if ep is None else f"\"epoch\": {self.millisecs_str(ep)}, "
+        time = self.millisecs_str(value.millisecs)
+        if value.stats is None:
+            return f"{{\"seq\": {value.seq}, \"time\": {time}, {epoch}\"temp\": {value.temp}, \"humidity\": {value.humidity} }}"
+        n, tmin, tmax, tsd, hmin, hmax, hsd = value.stats
+        return (f"{{\"seq\": {value.seq}, \"time\": {time}, {epoch}\"temp\": {value.temp}, \"humidity\": {value.humidity}, "
+                f"\"samples\": {n}, \"temp_min\": {tmin:.3f}, \"temp_max\": {tmax:.3f}, \"temp_sd\": {tsd:.4f}, "
+                f"\"humidity_min\": {hmin:.3f}, \"humidity_max\": {hmax:.3f}, \"humidity_sd\": {hsd:.4f} }}")